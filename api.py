@@ -7,8 +7,10 @@ from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from flask_restful import Api
 
+from commands import initialize_commands
 from database import initialize_db
 from resources import initialize_routes
+from utils.identity_map import initialize_identity_map
 
 # load environment variables from .env
 load_dotenv()
@@ -22,7 +24,7 @@ app.config['MONGODB_SETTINGS'] = {
 app.config['JWT_SECRET_KEY'] = os.getenv('JWT_SECRET_KEY')
 
 # enable cors
-cors = CORS(app)
+cors = CORS(app, expose_headers=['X-Next-Cursor'])
 
 # create restful api on top of the app
 api = Api(app)
@@ -39,6 +41,12 @@ initialize_db(app)
 # initialize resources routers
 initialize_routes(api)
 
+# initialize flask cli commands
+initialize_commands(app)
+
+# count documents loaded once per request
+initialize_identity_map(app)
+
 
 if __name__ == '__main__':
     # load start config
@@ -0,0 +1,7 @@
+from .indexes import indexes
+from .share_instance_views import rebuild_share_instance_views
+
+
+def initialize_commands(app):
+    app.cli.add_command(indexes)
+    app.cli.add_command(rebuild_share_instance_views)
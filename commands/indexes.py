@@ -0,0 +1,70 @@
+import click
+from flask.cli import with_appcontext
+from models import (DataSource, DisplaySchema, Project, ShareConfig,
+                    ShareInstanceView, User)
+
+'''
+Usage: FLASK_APP=api flask indexes diff
+       FLASK_APP=api flask indexes build
+       FLASK_APP=api flask indexes drop [--yes]
+'''
+
+DOCUMENTS = [User, Project, DataSource, DisplaySchema,
+             ShareConfig, ShareInstanceView]
+
+
+def _format_index(key) -> str:
+    return ', '.join('{} {}'.format(field, direction) for field, direction in key)
+
+
+def _get_extra_index_names(document) -> list:
+    """
+    Names of indexes in the database that are not declared in the model meta.
+    """
+    extra = document.compare_indexes()['extra']
+    return [name for name, info in document._get_collection().index_information().items()
+            if name != '_id_' and info['key'] in extra]
+
+
+@click.group('indexes')
+def indexes():
+    """Manage MongoDB indexes declared in the model meta."""
+
+
+@indexes.command('diff')
+@with_appcontext
+def diff_indexes():
+    """Show declared indexes missing in the database, and undeclared ones."""
+    for document in DOCUMENTS:
+        compared = document.compare_indexes()
+        collection = document._get_collection_name()
+        for key in compared['missing']:
+            click.echo('{}: missing ({})'.format(collection, _format_index(key)))
+        for key in compared['extra']:
+            if key != [('_id', 1)]:
+                click.echo('{}: extra ({})'.format(collection, _format_index(key)))
+
+
+@indexes.command('build')
+@with_appcontext
+def build_indexes():
+    """Build declared indexes missing in the database, in the background."""
+    for document in DOCUMENTS:
+        missing = document.compare_indexes()['missing']
+        # `index_background` of the meta makes the builds not block the collection
+        document.ensure_indexes()
+        click.echo('{}: {} index(es) built.'.format(
+            document._get_collection_name(), len(missing)))
+
+
+@indexes.command('drop')
+@click.option('--yes', is_flag=True, help='Drop without asking for confirmation.')
+@with_appcontext
+def drop_indexes(yes: bool):
+    """Drop indexes in the database that are not declared in the model meta."""
+    for document in DOCUMENTS:
+        collection = document._get_collection()
+        for name in _get_extra_index_names(document):
+            if yes or click.confirm('Drop index {} of {}?'.format(name, collection.name)):
+                collection.drop_index(name)
+                click.echo('{}: {} dropped.'.format(collection.name, name))
@@ -0,0 +1,15 @@
+import click
+from flask.cli import with_appcontext
+from services import ShareInstanceService
+
+'''
+Usage: FLASK_APP=api flask rebuild-share-instance-views
+'''
+
+
+@click.command('rebuild-share-instance-views')
+@with_appcontext
+def rebuild_share_instance_views():
+    """Regenerate the share instance read model from scratch."""
+    count = ShareInstanceService().rebuild_views()
+    click.echo('Rebuilt {} share instance views.'.format(count))
@@ -3,3 +3,4 @@ from .data_source_dao import DataSourceDao
 from .display_schema_dao import DisplaySchemaDao
 from .share_config_dao import ShareConfigDao
 from .project_dao import ProjectDao
+from .share_instance_view_dao import ShareInstanceViewDao
@@ -1,9 +1,17 @@
-from typing import List
+from typing import Dict, Iterable, List, Optional
+
+from bson import ObjectId
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFinishedYet, NotFoundError, NotMutableError,
                     UnauthorizedError)
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
+from utils.config import get_env_int
 from utils.guard import myguard
+from utils.identity_map import identity_map
+from utils.mongo_json import fill_defaults
+
+# most ids fetched by one `get_by_ids`
+MAX_BATCH_IDS = get_env_int('MAX_BATCH_IDS', 100)
 
 
 class BaseDao:
@@ -13,33 +21,131 @@ class BaseDao:
 
     def get_by_id(self, id: str):
         myguard.check_literaly.object_id(id)
+
+        item = identity_map.get(self.entity_type, id)
+        if item is not None:
+            return item
+
         try:
             item = self.entity_type.objects.get(id=id)
         except DoesNotExist:
             raise NotFoundError(self.entity_name, 'id={}'.format(id))
 
+        identity_map.put(item)
         return item
 
-    def get_by_ids(self, ids: List[int]):
+    def apply_projection(self, queryset, fields: Optional[List[str]]):
+        """
+        Push a field projection down into a query of listed documents.
+
+        Args:
+            queryset (QuerySet): query of documents of the entity
+            fields (List[str]): fields to load, all but `list_excluded_fields` of the entity if None, all if ['*']
+
+        Raises:
+            InvalidParamError: raises if a field does not exist
+
+        Returns:
+            QuerySet: query loading only the projected fields
+        """
+        if fields is None:
+            excluded_fields = getattr(self.entity_type, 'list_excluded_fields', [])
+            return queryset.exclude(*excluded_fields) if excluded_fields else queryset
+
+        if fields == ['*']:
+            return queryset
+
+        unknown_fields = [field for field in fields
+                          if field not in self.entity_type._fields]
+        if unknown_fields:
+            raise InvalidParamError('Unknown fields {} of {}.'.format(
+                unknown_fields, self.entity_name))
+
+        return queryset.only(*fields)
+
+    def get_version(self, id: str) -> dict:
+        """
+        Get the fields telling the version and the visibility of a document, without loading it.
+
+        Args:
+            id (str): document id
+
+        Raises:
+            NotFoundError: raises if document does not exist
+
+        Returns:
+            dict: raw `_id`, `modified`, `public` and `created_by` of document
+        """
+        myguard.check_literaly.object_id(id)
+        version = self.entity_type.objects(id=id).only(
+            'modified', 'public', 'created_by').as_pymongo().first()
+        if version is None:
+            raise NotFoundError(self.entity_name, 'id={}'.format(id))
+
+        return version
+
+    def get_raw_by_id(self, id: str) -> dict:
+        """
+        Get a document as loaded by pymongo, for read-only responses.
+        Nothing is hydrated and the identity map is not used, missing fields get their defaults.
+
+        Raises:
+            NotFoundError: raises if document does not exist
+        """
+        myguard.check_literaly.object_id(id)
+
+        item = self.entity_type.objects(id=id).as_pymongo().first()
+        if item is None:
+            raise NotFoundError(self.entity_name, 'id={}'.format(id))
+
+        return fill_defaults(self.entity_type, item)
+
+    def get_raw_by_id_set(self, ids: Iterable) -> Dict[ObjectId, dict]:
+        """
+        Get raw documents of stored ids with one `$in` query, such as resolving references.
+        Missing ids are left out.
+
+        Args:
+            ids (Iterable): stored ids of referenced documents
+
+        Returns:
+            Dict[ObjectId, dict]: raw documents by `_id`
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        return {item['_id']: fill_defaults(self.entity_type, item)
+                for item in self.entity_type.objects(id__in=ids).as_pymongo()}
+
+    def get_by_ids(self, ids: List[str], raw: bool = False, fields: Optional[List[str]] = None):
         # check if input contains duplicate ids
         set_ids = set(ids)
         if len(set_ids) != len(ids):
             raise InvalidParamError('Input contains duplicate ids.')
 
-        # query item via id
-        missing_ids = []
-        items = []
+        if len(ids) > MAX_BATCH_IDS:
+            raise InvalidParamError(
+                'At most {} ids are allowed in one query.'.format(MAX_BATCH_IDS))
+
         for id in ids:
-            try:
-                item = self.get_by_id(id)
-            except NotFoundError as e:
-                missing_ids.append(id)
-            else:
-                items.append(item)
+            myguard.check_literaly.object_id(id)
+
+        # query all items at once, as documents or as raw dicts, with only some fields if given
+        queryset = self.entity_type.objects(id__in=ids)
+        if fields is not None:
+            queryset = queryset.only(*fields)
+        if raw:
+            projection = queryset._loaded_fields.as_dict()
+            items_by_id = {str(item['_id']): fill_defaults(self.entity_type, item, projection)
+                           for item in queryset.as_pymongo()}
+        else:
+            items_by_id = {str(item.pk): item for item in queryset}
 
         # check if any items are missing from result set
+        missing_ids = [id for id in ids if str(id) not in items_by_id]
         if missing_ids:
             raise NotFoundError(target='{}(s)'.format(self.entity_name),
                                 queries=str(missing_ids))
 
-        return items
+        # keep the requested order
+        return [items_by_id[str(id)] for id in ids]
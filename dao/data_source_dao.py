@@ -1,12 +1,48 @@
-from typing import List
+import random
+import time
+from collections import namedtuple
+from typing import List, Optional
 from dao.base_dao import BaseDao
+from dao.document_events import document_written, references_removed
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFinishedYet, NotFoundError, NotMutableError,
-                    UnauthorizedError)
+                    UnauthorizedError, UpstreamUnavailableError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
-from services.api_fetch_service import ApiFetchService
+from services.api_fetch_service import ApiFetchService, UpstreamResponse
+from services.slot_binder import SlotBinder
+from utils.cache import TTLCache
+from utils.config import get_env_bool, get_env_int
+from utils.counters import KeyedCounters
 from utils.guard import myguard
+from utils.refresh_scheduler import RefreshJob, RefreshScheduler
+
+DEFAULT_CACHE_TTL = get_env_int('DATA_SOURCE_CACHE_TTL', 60)
+DEFAULT_MAX_STALENESS = get_env_int('DATA_SOURCE_MAX_STALENESS', 300)
+MAX_RETRY_DELAY = get_env_int('DATA_REFRESH_MAX_RETRY_DELAY', 30)
+# serve the last fetched data, however old, if upstream rejects fetches
+SERVE_LAST_ON_UNAVAILABLE = get_env_bool('DATA_SERVE_LAST_ON_UNAVAILABLE', True)
+
+RefreshPolicy = namedtuple(
+    'RefreshPolicy', ['interval', 'max_staleness', 'jitter'])
+
+# upstream responses with their validators, keyed by
+# (data source id, url, resolved request params, data paths)
+data_cache = TTLCache(
+    max_entries=get_env_int('DATA_CACHE_MAX_ENTRIES', 1024),
+    max_bytes=get_env_int('DATA_CACHE_MAX_BYTES', 64 * 1024 * 1024))
+
+# keeps cached upstream data fresh in the background
+data_refresher = RefreshScheduler('data-refresher')
+
+# data source id -> counts of upstream fetches by revalidation outcome:
+# `not_modified` (304), `modified` (validators sent, new body) and `unconditional`
+revalidations = KeyedCounters()
+
+# data source id -> (modified, compiled SlotBinder), every binder counts as size 1
+SLOT_BINDER_CACHE_SIZE = get_env_int('SLOT_BINDER_CACHE_SIZE', 4096)
+slot_binders = TTLCache(max_entries=SLOT_BINDER_CACHE_SIZE,
+                        max_bytes=SLOT_BINDER_CACHE_SIZE)
 
 
 class DataSourceDao(BaseDao):
@@ -19,6 +55,8 @@ class DataSourceDao(BaseDao):
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(data_source)
+
     def assert_fields_editable(self, mutation_body: dict) -> None:
         if not mutation_body or not isinstance(mutation_body, dict):
             raise InvalidParamError('"mutation_body" is not valid.')
@@ -28,6 +66,9 @@ class DataSourceDao(BaseDao):
                 raise NotMutableError(DataSource.__name__, field_name)
 
     def modify(self, data_source: DataSource, mutation_body: dict) -> None:
+        # slots may change, drop compiled binder
+        slot_binders.invalidate(str(data_source.pk))
+
         # update project
         try:
             data_source.modify(**mutation_body)
@@ -38,6 +79,8 @@ class DataSourceDao(BaseDao):
         except LookupError as e:
             raise InvalidParamError(e.message)
 
+        document_written(data_source)
+
     def get_a_copy(self, data_source: DataSource) -> DataSource:
         """
         Deeply copy a data source. Caution: Cloned document has not been saved to database yet.
@@ -64,6 +107,12 @@ class DataSourceDao(BaseDao):
                 (DataSource, data_source, "Data source", False)
             ])
 
+            slot_binders.invalidate(str(data_source.pk))
+            revalidations.discard(str(data_source.pk))
+
+            # projects pulling the data source on delete
+            project_ids = list(Project.objects(data_sources=data_source.pk).scalar('id'))
+
             # TODO: add more error handling
             try:
                 data_source.delete(*args, **kwargs)
@@ -71,6 +120,9 @@ class DataSourceDao(BaseDao):
                 raise NotFoundError('Data source', 'id={}'.format(
                     getattr(data_source, 'id', 'None')))
 
+            document_written(data_source)
+            references_removed(Project, project_ids)
+
     def export_slots_to_dicts(self, data_source: DataSource):
         myguard.check_literaly.check_type([
             (DataSource, data_source, "Data source", False)
@@ -88,10 +140,139 @@ class DataSourceDao(BaseDao):
         # convert documents to SON object and then dictionary
         return [slot.to_mongo().to_dict() for slot in slots]
 
-    def refresh_data(self, data_source: DataSource, query: dict):
-        slots = self.export_slots_to_dicts(data_source)
+    def get_slot_binder(self, data_source: DataSource) -> SlotBinder:
+        """
+        Get the compiled slots of a data source, compiled once per version of it.
+
+        Args:
+            data_source (DataSource): data source
+
+        Returns:
+            SlotBinder: binder of the slots of data source
+        """
+        key = str(data_source.pk)
+        version = getattr(data_source, 'modified', None)
+
+        entry = slot_binders.get_entry(key)
+        if entry is not None and entry.value[0] == version:
+            return entry.value[1]
+
+        binder = SlotBinder(self.export_slots_to_dicts(data_source))
+        slot_binders.set(key, (version, binder), 1, float('inf'))
+        return binder
+
+    def get_refresh_policy(self, data_source: DataSource) -> RefreshPolicy:
+        policy = getattr(data_source, 'refresh_policy', None)
+        if policy is not None:
+            return RefreshPolicy(policy.interval, policy.max_staleness, policy.jitter)
+
+        cache_ttl = getattr(data_source, 'cache_ttl', None)
+        if cache_ttl is None:
+            cache_ttl = DEFAULT_CACHE_TTL
+        return RefreshPolicy(cache_ttl, DEFAULT_MAX_STALENESS, 0)
+
+    def fetch_upstream(self, cache_key: tuple, url: str, request_params: dict,
+                       data_paths: List[str]) -> UpstreamResponse:
+        """
+        Fetch upstream data, revalidating the last cached response of the same request if any.
+
+        Args:
+            cache_key (tuple): key of the request in data cache
+            url (str): upstream url
+            request_params (dict): resolved request params
+            data_paths (List[str]): dotted paths to keep from the response
+
+        Returns:
+            UpstreamResponse: fresh response, or the last one if upstream did not modify it
+        """
+        last_entry = data_cache.peek_entry(cache_key)
+        previous = last_entry.value if last_entry is not None else None
+
+        response = ApiFetchService().fetch(url, request_params, data_paths, previous)
+
+        if response.not_modified:
+            outcome = 'not_modified'
+        elif previous is not None and (previous.etag or previous.last_modified):
+            outcome = 'modified'
+        else:
+            outcome = 'unconditional'
+        revalidations.incr(cache_key[0], outcome)
+
+        return response
+
+    def _schedule_refresh(self, cache_key: tuple, url: str, request_params: dict,
+                          data_paths: List[str], policy: RefreshPolicy, delay: Optional[float]) -> None:
+        def get_next_delay():
+            # refresh a bit before expiry, and spread refreshes out
+            return max(0, policy.interval - random.uniform(0, policy.jitter))
+
+        def refresh():
+            response = self.fetch_upstream(
+                cache_key, url, request_params, data_paths)
+            data_cache.set(cache_key, response, response.size,
+                           policy.interval, policy.max_staleness)
+            return get_next_delay()
+
+        job = RefreshJob(cache_key, refresh,
+                         retry_delay=min(policy.interval, MAX_RETRY_DELAY),
+                         idle_timeout=policy.interval + policy.max_staleness)
+        data_refresher.schedule(
+            job, get_next_delay() if delay is None else delay)
+
+    def refresh_data(self, data_source: DataSource, query: dict) -> None:
+        data_source.data = self.get_data(data_source, query)
+
+    def get_data(self, data_source: DataSource, query: dict):
+        """
+        Get upstream data of a data source for a request query, from cache if possible.
+
+        Args:
+            data_source (DataSource): data source
+            query (dict): request query
+
+        Returns:
+            upstream data, trimmed to the data paths of data source
+        """
+        request_params = self.get_slot_binder(data_source).bind(query)
 
         api_fetch_service = ApiFetchService()
-        data = api_fetch_service.get_data(
-            data_source.url, slots, query)
-        data_source.data = data
+
+        data_paths = list(getattr(data_source, 'data_paths', None) or [])
+
+        policy = self.get_refresh_policy(data_source)
+        if policy.interval <= 0:
+            # caching is disabled for this data source
+            return api_fetch_service.fetch(
+                data_source.url, request_params, data_paths).data
+
+        # serve identical requests from cache, even stale ones within max staleness
+        cache_key = (str(data_source.pk), data_source.url,
+                     tuple(sorted(request_params.items())), tuple(data_paths))
+
+        entry = data_cache.get_entry(cache_key)
+        if entry is not None:
+            data_refresher.touch(cache_key)
+            if entry.is_expired(time.monotonic()):
+                # revalidate in background as soon as possible
+                self._schedule_refresh(cache_key, data_source.url, request_params,
+                                       data_paths, policy, 0)
+
+            return entry.value.data
+
+        try:
+            response = self.fetch_upstream(
+                cache_key, data_source.url, request_params, data_paths)
+        except UpstreamUnavailableError:
+            last_entry = data_cache.peek_entry(cache_key)
+            if not SERVE_LAST_ON_UNAVAILABLE or last_entry is None:
+                raise
+
+            return last_entry.value.data
+
+        data_cache.set(cache_key, response, response.size,
+                       policy.interval, policy.max_staleness)
+        data_refresher.touch(cache_key)
+        self._schedule_refresh(cache_key, data_source.url, request_params,
+                               data_paths, policy, None)
+
+        return response.data
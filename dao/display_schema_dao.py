@@ -1,9 +1,21 @@
+import datetime
+
 from dao.base_dao import BaseDao
+from dao.document_events import document_written, references_removed
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
+from services.option_template import OptionTemplate
+from utils.cache import TTLCache
+from utils.config import get_env_int
 from utils.guard import myguard
+from utils.identity_map import identity_map
+
+# display schema id -> (modified, compiled OptionTemplate), every template counts as size 1
+OPTION_TEMPLATE_CACHE_SIZE = get_env_int('OPTION_TEMPLATE_CACHE_SIZE', 1024)
+option_templates = TTLCache(max_entries=OPTION_TEMPLATE_CACHE_SIZE,
+                            max_bytes=OPTION_TEMPLATE_CACHE_SIZE)
 
 
 class DisplaySchemaDao(BaseDao):
@@ -17,13 +29,21 @@ class DisplaySchemaDao(BaseDao):
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(display_schema)
+
     def get_by_id(self, id: str) -> DisplaySchema:
         myguard.check_literaly.object_id(id, 'display_schema')
+
+        display_schema = identity_map.get(DisplaySchema, id)
+        if display_schema is not None:
+            return display_schema
+
         try:
             display_schema = DisplaySchema.objects.get(id=id)
         except DoesNotExist:
             raise NotFoundError('display schema', 'id={}'.format(id))
 
+        identity_map.put(display_schema)
         return display_schema
 
     def assert_fields_editable(self, mutation_body: dict):
@@ -35,6 +55,13 @@ class DisplaySchemaDao(BaseDao):
                 raise NotMutableError(DisplaySchema.__name__, field_name)
 
     def modify(self, display_schema: DisplaySchema, body: dict) -> None:
+        # echarts option may change, drop compiled template
+        option_templates.invalidate(str(display_schema.pk))
+
+        # every change is a new version of display schema, including relinking
+        if 'modified' not in body:
+            body = dict(body, modified=datetime.datetime.utcnow)
+
         try:
             display_schema.modify(**body)
         except ValidationError as e:
@@ -42,6 +69,8 @@ class DisplaySchemaDao(BaseDao):
         except LookupError as e:
             raise InvalidParamError(e.message)
 
+        document_written(display_schema)
+
     def get_a_copy(self,  display_schema: DisplaySchema) -> DisplaySchema:
         """
         Deeply copy a display schema. Caution: Cloned document has not been saved to database yet.
@@ -69,9 +98,41 @@ class DisplaySchemaDao(BaseDao):
                 (DisplaySchema, display_schema, "display schema", False)
             ])
 
+            option_templates.invalidate(str(display_schema.pk))
+
+            # projects nullifying the display schema on delete
+            project_ids = list(Project.objects(display_schema=display_schema.pk).scalar('id'))
+
             # TODO: add more error handling
             try:
                 display_schema.delete(*args, **kwargs)
             except DoesNotExist as e:
                 raise NotFoundError('display schema', 'id={}'.format(
                     getattr(display_schema, 'id', 'None')))
+
+            document_written(display_schema)
+            references_removed(Project, project_ids)
+
+    def get_option_template(self, display_schema: DisplaySchema) -> OptionTemplate:
+        """
+        Get the compiled echarts option of a display schema, compiled once per version of it.
+
+        Args:
+            display_schema (DisplaySchema): display schema
+
+        Raises:
+            InvalidParamError: raises if echarts option is not a valid JSON
+
+        Returns:
+            OptionTemplate: template of the echarts option
+        """
+        key = str(display_schema.pk)
+        version = getattr(display_schema, 'modified', None)
+
+        entry = option_templates.get_entry(key)
+        if entry is not None and entry.value[0] == version:
+            return entry.value[1]
+
+        template = OptionTemplate(display_schema.echarts_option)
+        option_templates.set(key, (version, template), 1, float('inf'))
+        return template
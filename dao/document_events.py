@@ -0,0 +1,32 @@
+import datetime
+
+from dao.share_instance_view_dao import sync_share_instances
+from utils.identity_map import identity_map
+
+
+def document_written(document) -> None:
+    """
+    Keep the request identity map, share instance views and cached share instances
+    in sync with a document, after it is written or deleted.
+    """
+    if document is None or document.pk is None:
+        return
+    identity_map.evict(document)
+    sync_share_instances(document)
+
+
+def references_removed(document_type: type, ids: list) -> None:
+    """
+    Make new versions of documents whose references were pulled or nullified by
+    the reverse delete rule of a deleted document, so their ETags change.
+
+    Args:
+        document_type (type): type of the referencing documents
+        ids (list): ids of the referencing documents, read before the delete
+    """
+    if not ids:
+        return
+    document_type.objects(id__in=ids).update(
+        set__modified=datetime.datetime.utcnow())
+    for id in ids:
+        document_written(document_type(id=id))
@@ -1,93 +1,147 @@
 
+import datetime
 from typing import List
+
+from bson import ObjectId
 from dao.base_dao import BaseDao
+from database import run_in_transaction
+from dao.document_events import document_written, references_removed
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
+from pymongo import UpdateOne
 from utils.guard import myguard
+from utils.identity_map import identity_map
+from utils.ownership import get_reference_id
 
 
 class ProjectDao(BaseDao):
     def __init__(self, entity_type: type = Project, entity_name: str = 'project') -> None:
         super().__init__(entity_type, entity_name)
 
-    def add_data_source(self, project: Project, data_source: DataSource):
+    def add_data_source(self, project: Project, data_source: DataSource) -> Project:
         # literally check input
-        myguard.check_literaly.is_not_null(project, 'Project')
         myguard.check_literaly.is_not_null(data_source, 'DataSource')
 
-        # add item
-        try:
-            project.update(push__data_sources=data_source)
-        except ValidationError as e:
-            raise InvalidParamError(e.message)
+        return self.add_data_sources(project, [data_source.pk])
+
+    def add_data_sources(self, project: Project, data_source_ids: List[ObjectId]) -> Project:
+        """
+        Append data sources to a project, if none of them is in it yet.
+
+        Membership is checked on stored ids by the same `find_one_and_update` that
+        appends them, so no data source is loaded and no concurrent add can duplicate one.
+
+        Args:
+            project (Project): project
+            data_source_ids (List[ObjectId]): ids of data sources to append
+
+        Raises:
+            InvalidParamError: raises if a data source is already in project
 
-    def add_data_sources(self, project: Project, data_sources: List[DataSource]):
+        Returns:
+            Project: updated project
+        """
         # literally check input
         myguard.check_literaly.is_not_null(project, 'Project')
-        for data_source in data_sources:
-            myguard.check_literaly.is_not_null(data_source, 'DataSource')
-
-        # assert no provided data_sources already in project
-        # TODO: need a refine for performance
-        data_sources_in_project = set(getattr(project, 'data_sources', None))
-        for data_source in data_sources:
-            if data_source in data_sources_in_project:
-                raise InvalidParamError(
-                    'data_source {} already in project {}'.format(data_source.pk, project.pk))
-
-        # add all
+        if not data_source_ids:
+            return project
+
+        # add all, only if none is in project
         try:
-            project.update(push_all__data_sources=data_sources)
+            updated_project = Project.objects(
+                id=project.pk, data_sources__nin=data_source_ids).modify(
+                new=True,
+                push_all__data_sources=data_source_ids,
+                set__modified=datetime.datetime.utcnow())
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
-    def remove_data_source(self, project: Project, data_source: DataSource):
+        if updated_project is None:
+            data_source_ids_in_project = self._get_data_source_ids(project)
+            for data_source_id in data_source_ids:
+                if data_source_id in data_source_ids_in_project:
+                    raise InvalidParamError(
+                        'data_source {} already in project {}'.format(data_source_id, project.pk))
+
+            # data sources of project changed in between, try again
+            return self.add_data_sources(project, data_source_ids)
+
+        document_written(updated_project)
+        return updated_project
+
+    def remove_data_source(self, project: Project, data_source: DataSource) -> Project:
         # literally check input
-        myguard.check_literaly.is_not_null(project, 'Project')
         myguard.check_literaly.is_not_null(data_source, 'DataSource')
 
-        # assert all provided data_sources already in project
-        if data_source not in getattr(project, 'data_sources', None):
-            raise InvalidParamError(
-                'data_source {} not in project {}'.format(data_source.pk, project.pk))
+        return self.remove_data_sources(project, [data_source.pk])
 
-        # add item
-        try:
-            project.update(pull__data_sources=data_source)
-        except ValidationError as e:
-            raise InvalidParamError(e.message)
+    def remove_data_sources(self, project: Project, data_source_ids: List[ObjectId]) -> Project:
+        """
+        Remove data sources from a project, if all of them are in it.
+
+        Membership is checked on stored ids by the same `find_one_and_update` that
+        removes them, so no data source is loaded.
 
-    def remove_data_sources(self, project: Project, data_sources: List[DataSource]):
+        Args:
+            project (Project): project
+            data_source_ids (List[ObjectId]): ids of data sources to remove
+
+        Raises:
+            InvalidParamError: raises if a data source is not in project
+
+        Returns:
+            Project: updated project
+        """
         # literally check input
         myguard.check_literaly.is_not_null(project, 'Project')
-        data_sources_in_project = set(getattr(project, 'data_sources', None))
-        for data_source in data_sources:
-            myguard.check_literaly.is_not_null(data_source, 'DataSource')
-
-        # assert all provided data_sources already in project
-        # TODO: need a refine for performance
-        for data_source in data_sources:
-            if data_source not in data_sources_in_project:
-                raise InvalidParamError(
-                    'data_source {} not in project {}'.format(data_source.pk, project.pk))
-
-        # add all
+        if not data_source_ids:
+            return project
+
+        # remove all, only if all are in project
         try:
-            project.update(pull_all__data_sources=data_sources)
+            updated_project = Project.objects(
+                id=project.pk, data_sources__all=data_source_ids).modify(
+                new=True,
+                pull_all__data_sources=data_source_ids,
+                set__modified=datetime.datetime.utcnow())
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        if updated_project is None:
+            data_source_ids_in_project = self._get_data_source_ids(project)
+            for data_source_id in data_source_ids:
+                if data_source_id not in data_source_ids_in_project:
+                    raise InvalidParamError(
+                        'data_source {} not in project {}'.format(data_source_id, project.pk))
+
+            # data sources of project changed in between, try again
+            return self.remove_data_sources(project, data_source_ids)
+
+        document_written(updated_project)
+        return updated_project
+
+    def _get_data_source_ids(self, project: Project) -> set:
+        # stored ids of data sources in project, explains a conditional update that matched nothing
+        raw_project = Project.objects(id=project.pk).only(
+            'data_sources').as_pymongo().first()
+        if raw_project is None:
+            raise NotFoundError('project', 'id={}'.format(project.pk))
+        return set(raw_project.get('data_sources', []))
+
     def add_share_config(self, project: Project, share_config: ShareConfig):
         myguard.check_literaly.is_not_null(project, 'Project')
         myguard.check_literaly.is_not_null(share_config, 'ShareConfig')
 
         try:
-            project.update(push__share_configs=share_config)
+            project.update(push__share_configs=share_config,
+                           set__modified=datetime.datetime.utcnow())
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(project)
+
     def save(self, project: Project, *args, **kwargs):
         myguard.check_literaly.is_not_null(project, 'Project')
 
@@ -96,15 +150,22 @@ class ProjectDao(BaseDao):
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(project)
+
     def get_by_id(self, id) -> Project:
         # query project via id
         myguard.check_literaly.object_id(id)
 
+        project = identity_map.get(Project, id)
+        if project is not None:
+            return project
+
         try:
             project = Project.objects.get(id=id)
         except DoesNotExist:
             raise NotFoundError('project', 'id={}'.format(id))
 
+        identity_map.put(project)
         return project
 
     def assert_fields_editable(self, body: dict) -> None:
@@ -113,6 +174,10 @@ class ProjectDao(BaseDao):
                 raise NotMutableError(Project.__name__, field_name)
 
     def modify(self, project: Project, body: dict) -> None:
+        # every change is a new version of project, including relinking
+        if 'modified' not in body:
+            body = dict(body, modified=datetime.datetime.utcnow)
+
         try:
             project.modify(**body)
         except ValidationError as e:
@@ -120,11 +185,63 @@ class ProjectDao(BaseDao):
         except LookupError as e:
             raise InvalidParamError(e.message)
 
+        document_written(project)
+
     def change_display_schema(self, project: Project, display_schema: DisplaySchema):
         # register new display schema in project
         body = {'display_schema': display_schema}
         self.modify(project, body)
 
+    def link_display_schema(self, project: Project, display_schema: DisplaySchema) -> None:
+        """
+        Link a project and a display schema to each other, unlinking their previous partners.
+
+        Each collection is written with one bulk write, both in one transaction if the
+        deployment supports it, so readers never see a half relinked pair.
+        The given instances are not refreshed.
+
+        Args:
+            project (Project): project to link
+            display_schema (DisplaySchema): display schema to link
+        """
+        # previous partners, read from stored ids without loading them
+        old_display_schema_id = get_reference_id(project, 'display_schema')
+        if old_display_schema_id == display_schema.pk:
+            old_display_schema_id = None
+        old_project_id = get_reference_id(display_schema, 'linked_project')
+        if old_project_id == project.pk:
+            old_project_id = None
+
+        # every change is a new version of the documents, including relinking
+        now = datetime.datetime.utcnow()
+
+        project_writes = [UpdateOne({'_id': project.pk}, {'$set': {
+            'display_schema': display_schema.pk, 'modified': now}})]
+        if old_project_id is not None:
+            project_writes.append(UpdateOne({'_id': old_project_id}, {'$set': {
+                'display_schema': None, 'modified': now}}))
+
+        display_schema_writes = [UpdateOne({'_id': display_schema.pk}, {'$set': {
+            'linked_project': project.pk, 'modified': now}})]
+        if old_display_schema_id is not None:
+            display_schema_writes.append(UpdateOne({'_id': old_display_schema_id}, {'$set': {
+                'linked_project': None, 'modified': now}}))
+
+        def write(session):
+            Project._get_collection().bulk_write(project_writes, session=session)
+            DisplaySchema._get_collection().bulk_write(
+                display_schema_writes, session=session)
+
+        run_in_transaction(write)
+
+        written = [project, display_schema]
+        if old_project_id is not None:
+            written.append(Project(id=old_project_id))
+        if old_display_schema_id is not None:
+            written.append(DisplaySchema(id=old_display_schema_id))
+        for document in written:
+            document_written(document)
+
     def get_a_shallow_copy(self, project: Project) -> Project:
         """
         Shallowly copy a project. Caution: Cloned document has not been saved to database yet.
@@ -152,9 +269,17 @@ class ProjectDao(BaseDao):
                 (Project, project, "project", False)
             ])
 
+            # display schemas nullifying the project on delete
+            display_schema_ids = list(DisplaySchema.objects(
+                linked_project=project.pk).scalar('id'))
+
             # TODO: add more error handling
             try:
                 project.delete(*args, **kwargs)
             except DoesNotExist as e:
                 raise NotFoundError('project', 'id={}'.format(
                     getattr(project, 'id', 'None')))
+
+            document_written(project)
+            references_removed(DisplaySchema, display_schema_ids)
+
@@ -1,8 +1,14 @@
+from typing import Dict, Iterable
+
+from bson import ObjectId
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
+from dao.document_events import document_written, references_removed
 from utils.guard import myguard
+from utils.identity_map import identity_map
+from utils.mongo_json import fill_defaults
 
 
 class ShareConfigDao:
@@ -15,11 +21,15 @@ class ShareConfigDao:
             raise InvalidParamError(
                 'Input "share_config" is None or not a type of ShareConfig.')
 
+        self.assert_password_value_match(share_config.password, password)
+
+    def assert_password_value_match(self, share_config_password: str, password: str) -> None:
         if not password:
             raise InvalidParamError(
                 "This share config is password-protected. Please provide password in the JSON body.")
 
-        if not self.check_password(share_config, password):
+        myguard.check_literaly.password(password=password, is_new=False)
+        if share_config_password != password:
             raise ForbiddenError('Password is not correct.')
 
     def desensitize(self, share_config: ShareConfig):
@@ -29,19 +39,47 @@ class ShareConfigDao:
     def get_by_id(self, id: str) -> ShareConfig:
         myguard.check_literaly.object_id(id)
 
+        share_config = identity_map.get(ShareConfig, id)
+        if share_config is not None:
+            return share_config
+
         # get share config from database
         try:
             share_config = ShareConfig.objects.get(id=id)
         except DoesNotExist:
             raise NotFoundError('share_configs', 'id={}'.format(id))
+
+        identity_map.put(share_config)
         return share_config
 
+    def get_raw_by_id(self, id: str) -> dict:
+        myguard.check_literaly.object_id(id)
+
+        # raw document, for read-only responses
+        share_config = ShareConfig.objects(id=id).as_pymongo().first()
+        if share_config is None:
+            raise NotFoundError('share_configs', 'id={}'.format(id))
+        return fill_defaults(ShareConfig, share_config)
+
+    def get_raw_by_id_set(self, ids: Iterable) -> Dict[ObjectId, dict]:
+        """
+        Get raw share configs of stored ids with one `$in` query, without their passwords.
+        Missing ids are left out.
+        """
+        ids = list(ids)
+        if not ids:
+            return {}
+        return {share_config['_id']: fill_defaults(ShareConfig, share_config, {'password': 0})
+                for share_config in ShareConfig.objects(id__in=ids).exclude('password').as_pymongo()}
+
     def save(self, share_config: ShareConfig, *args, **kwargs) -> None:
         try:
             share_config.save(*args, **kwargs)
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(share_config)
+
     def modify(self, share_config: ShareConfig, body: dict) -> None:
         try:
             share_config.modify(**body)
@@ -50,6 +88,8 @@ class ShareConfigDao:
         except LookupError as e:
             raise InvalidParamError(e.message)
 
+        document_written(share_config)
+
     def assert_fields_editable(self, body: dict) -> None:
         for field_name in ShareConfig.uneditable_fields:
             if body.get(field_name, None):
@@ -62,9 +102,16 @@ class ShareConfigDao:
                 (ShareConfig, share_config, "share config", False)
             ])
 
+            # projects pulling the share config on delete
+            project_ids = list(Project.objects(share_configs=share_config.pk).scalar('id'))
+
             # TODO: add more error handling
             try:
                 share_config.delete(*args, **kwargs)
             except DoesNotExist as e:
                 raise NotFoundError('share config', 'id={}'.format(
                     getattr(share_config, 'id', 'None')))
+
+            document_written(share_config)
+            references_removed(Project, project_ids)
+
@@ -0,0 +1,29 @@
+from typing import Hashable
+
+from utils.cache import DependencyCache
+from utils.config import get_env_int
+
+'''
+Import example: from dao.share_instance_cache import share_instance_cache
+
+Entries depend on ('<document class name>', '<id>') keys, DAOs invalidate them on writes.
+'''
+
+# rendered share instances keyed by (share config id, request query without password)
+share_instance_cache = DependencyCache(
+    max_entries=get_env_int('SHARE_INSTANCE_CACHE_MAX_ENTRIES', 1024),
+    max_bytes=get_env_int('SHARE_INSTANCE_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+
+def get_dependency(entity_type: type, id) -> Hashable:
+    return (entity_type.__name__, str(id))
+
+
+def invalidate_share_instances(document) -> None:
+    """
+    Drop cached share instances built from a document, after it is written.
+    """
+    if document is None or document.pk is None:
+        return
+    share_instance_cache.invalidate_dependency(
+        get_dependency(type(document), document.pk))
@@ -0,0 +1,125 @@
+import datetime
+from typing import List, Optional
+
+from dao.share_instance_cache import invalidate_share_instances
+from models import (DataSource, DisplaySchema, Project, ShareConfig,
+                    ShareInstanceView)
+from mongoengine.errors import DoesNotExist
+from utils.guard import myguard
+
+# fields of the documents that a share instance reads, the rest is not copied
+DATA_SOURCE_FIELDS = ['_id', 'modified', 'url', 'slots',
+                      'data_paths', 'cache_ttl', 'refresh_policy']
+DISPLAY_SCHEMA_FIELDS = ['_id', 'modified', 'echarts_option']
+
+
+def _pick(document, fields: List[str]) -> dict:
+    son = document.to_mongo()
+    return {field: son[field] for field in fields if field in son}
+
+
+class ShareInstanceViewDao:
+    def get_by_id(self, id: str) -> Optional[ShareInstanceView]:
+        myguard.check_literaly.object_id(id)
+        return ShareInstanceView.objects(id=id).first()
+
+    def build(self, share_config: ShareConfig) -> Optional[ShareInstanceView]:
+        """
+        Build and save the view of a share config from its current documents.
+
+        Args:
+            share_config (ShareConfig): share config
+
+        Returns:
+            ShareInstanceView: saved view, or None if the share config has no project
+        """
+        try:
+            project = share_config.linked_project
+        except DoesNotExist:
+            project = None
+        if project is None:
+            ShareInstanceView.objects(id=share_config.pk).delete()
+            return None
+
+        # dangling references are skipped, same as when reading the project
+        data_sources = [data_source for data_source in project.data_sources
+                        if isinstance(data_source, DataSource)]
+        display_schema = project.display_schema
+        if not isinstance(display_schema, DisplaySchema):
+            display_schema = None
+
+        view = ShareInstanceView(
+            id=share_config.pk,
+            password=share_config.password,
+            project=project.pk,
+            display_schema_id=display_schema.pk if display_schema else None,
+            data_source_ids=[data_source.pk for data_source in data_sources],
+            display_schema=_pick(display_schema, DISPLAY_SCHEMA_FIELDS) if display_schema else None,
+            data_sources=[_pick(data_source, DATA_SOURCE_FIELDS)
+                          for data_source in data_sources],
+            built=datetime.datetime.utcnow())
+        view.save()
+        return view
+
+    def rebuild(self, share_config_ids: list) -> None:
+        """
+        Rebuild views of share configs, deleting those whose share config no longer exists.
+        """
+        share_config_ids = list(share_config_ids)
+        share_configs = {share_config.pk: share_config
+                         for share_config in ShareConfig.objects(id__in=share_config_ids)}
+
+        for id in share_config_ids:
+            share_config = share_configs.get(id)
+            if share_config is None:
+                ShareInstanceView.objects(id=id).delete()
+            else:
+                self.build(share_config)
+
+    def rebuild_all(self) -> int:
+        """
+        Regenerate all views from scratch.
+
+        Returns:
+            int: number of views built
+        """
+        ShareInstanceView.objects.delete()
+
+        count = 0
+        for share_config in ShareConfig.objects:
+            if self.build(share_config) is not None:
+                count += 1
+        return count
+
+    def sync(self, document) -> None:
+        """
+        Rebuild the views built from a written document.
+
+        Args:
+            document: written or deleted share config, project, display schema or data source
+        """
+        pk = document.pk
+        if isinstance(document, ShareConfig):
+            share_config_ids = [pk]
+        elif isinstance(document, Project):
+            # views of the project, and share configs just linked to it
+            share_config_ids = set(ShareInstanceView.objects(project=pk).distinct('id'))
+            share_config_ids.update(ShareConfig.objects(linked_project=pk).distinct('id'))
+        elif isinstance(document, DisplaySchema):
+            share_config_ids = ShareInstanceView.objects(display_schema_id=pk).distinct('id')
+        elif isinstance(document, DataSource):
+            share_config_ids = ShareInstanceView.objects(data_source_ids=pk).distinct('id')
+        else:
+            return
+
+        self.rebuild(share_config_ids)
+
+
+def sync_share_instances(document) -> None:
+    """
+    Drop cached share instances built from a document and rebuild their views, after it is written.
+    """
+    if document is None or document.pk is None:
+        return
+    ShareInstanceViewDao().sync(document)
+    invalidate_share_instances(document)
@@ -1,5 +1,6 @@
 
 
+from dao.document_events import document_written
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 from flask_bcrypt import check_password_hash, generate_password_hash
@@ -7,6 +8,7 @@ from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
 import utils
 from utils.guard import myguard
+from utils.identity_map import identity_map
 
 
 class UserDao:
@@ -18,6 +20,8 @@ class UserDao:
         except NotUniqueError:
             raise EmailAlreadyExistsError(user.email)
 
+        document_written(user)
+
     def modify(self, user: User, modifing_dict: dict) -> None:
         # update project
         try:
@@ -27,6 +31,8 @@ class UserDao:
         except LookupError as e:
             raise InvalidParamError(e.message)
 
+        document_written(user)
+
     def get_user_by_id_with_sensitive_info(self, id: str) -> User:
         # check authorization
         myguard.check_literaly.user_id(id)
@@ -47,9 +53,15 @@ class UserDao:
         Returns:
             User: desensitized user with provided id
         """
+        # only desensitized users are kept in identity map
+        user = identity_map.get(User, id)
+        if user is not None:
+            return user
+
         user = self.get_user_by_id_with_sensitive_info(id)
 
         user.desensitize()
+        identity_map.put(user)
         return user
 
     def get_user_by_email_with_sensitive_info(self, email: str) -> User:
@@ -75,12 +87,16 @@ class UserDao:
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(user)
+
     def add_data_source(self, user: User, data_source: DataSource):
         try:
             user.update(push__data_sources=data_source)
         except ValidationError as e:
             raise InvalidParamError(e.message)
 
+        document_written(user)
+
     def hash_password(self, user: User):
         if not user:
             raise InvalidParamError('User for hashing password cannot be null')
@@ -131,6 +147,8 @@ class UserDao:
             raise NotFoundError('User', 'id={}'.format(
                 getattr(user, 'id', 'None')))
 
+        document_written(user)
+
     def change_username(self, user: User, username: str) -> User:
         myguard.check_literaly.check_type([
             (User, user, "User", False)
@@ -146,3 +164,6 @@ class UserDao:
         except NotUniqueError as e:
             raise InvalidParamError(
                 'Username {} is not unique.'.format(username))
+
+        document_written(user)
+
@@ -1,7 +1,34 @@
+from typing import Callable
+
 from flask_mongoengine import MongoEngine
+from mongoengine.connection import get_connection
 
 db = MongoEngine()
 
 
 def initialize_db(app):
     db.init_app(app)
+
+
+def supports_transactions() -> bool:
+    # multi-document transactions need a replica set or a sharded cluster
+    description = getattr(get_connection(), 'topology_description', None)
+    return description is not None and \
+        description.topology_type_name in ('ReplicaSetWithPrimary', 'Sharded')
+
+
+def run_in_transaction(callback: Callable):
+    """
+    Run writes in one transaction when the deployment supports it.
+
+    Args:
+        callback (Callable): takes the session to pass to pymongo writes, None without transaction
+
+    Returns:
+        object: return value of callback
+    """
+    if not supports_transactions():
+        return callback(None)
+
+    with get_connection().start_session() as session:
+        return session.with_transaction(callback)
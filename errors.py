@@ -40,6 +40,21 @@ class ForbiddenError(ServerError):
         super().__init__('Forbidden', 403, detail)
 
 
+class UpstreamError(ServerError):
+    def __init__(self, detail):
+        super().__init__('Bad Gateway', 502, detail)
+
+
+class UpstreamTimeoutError(ServerError):
+    def __init__(self, detail):
+        super().__init__('Gateway Timeout', 504, detail)
+
+
+class UpstreamUnavailableError(ServerError):
+    def __init__(self, detail):
+        super().__init__('Service Unavailable', 503, detail)
+
+
 class NotFinishedYet(Exception):
     """
     A remark for codes working in progress
@@ -3,8 +3,8 @@ from database import db
 from mongoengine import (EmbeddedDocument, EmbeddedDocumentField,
                          EmbeddedDocumentListField)
 from mongoengine.fields import (BooleanField, DateTimeField, DictField,
-                                EmailField, ListField, ReferenceField,
-                                StringField, URLField)
+                                EmailField, IntField, ListField,
+                                ReferenceField, StringField, URLField)
 
 
 class DataSourceSlot(EmbeddedDocument):
@@ -19,6 +19,15 @@ class DataSourceSlot(EmbeddedDocument):
         return ['name', 'slot_type', 'optional', 'default', 'alias']
 
 
+class DataSourceRefreshPolicy(EmbeddedDocument):
+    # seconds before fetched data is refreshed
+    interval = IntField(required=True, min_value=0)
+    # seconds that expired data can still be served while refreshing
+    max_staleness = IntField(required=True, default=0, min_value=0)
+    # max seconds to refresh earlier than interval, spreads out refreshes
+    jitter = IntField(required=True, default=0, min_value=0)
+
+
 class DataSourceExample(EmbeddedDocument):
     params = DictField(required=True)
     data = DictField(required=True)
@@ -39,14 +48,35 @@ class DataSource(db.Document):
     slots = EmbeddedDocumentListField(DataSourceSlot, required=True)
     examples = EmbeddedDocumentListField(
         DataSourceExample, default=[])
+    # seconds to cache fetched data, server default if null,
+    # positive when set, disable caching with a refresh_policy interval of 0
+    cache_ttl = IntField(min_value=0, default=None, null=True)
+    # dotted paths of fetched data to keep, keep the whole response if empty
+    data_paths = ListField(StringField(max_length=200), default=[])
+    # background refresh of cached data, overrides cache_ttl if provided
+    refresh_policy = EmbeddedDocumentField(
+        DataSourceRefreshPolicy, default=None, null=True)
 
     # only used in returned massages
     data = DictField(null=True)
 
     uneditable_fields = ['created', 'modified', 'created_by']
 
+    # heavy fields not loaded by list endpoints unless asked for
+    list_excluded_fields = ['static_data', 'examples']
+
+    meta = {
+        'indexes': [
+            # keyset pagination of list endpoints, newest first
+            ('-created', '-id'),
+            ('public', '-created', '-id'),
+            ('created_by', '-created', '-id'),
+        ],
+        'index_background': True,
+    }
+
     @property
     def property_lists(self):
         return ['name', 'created', 'modified', 'created_by',
                 'public', 'description', 'static_data', 'data_type',
-                'url', 'slots', 'examples']
+                'url', 'slots', 'examples', 'data_paths', 'cache_ttl', 'refresh_policy']
@@ -17,6 +17,21 @@ class DisplaySchema(db.Document):
 
     uneditable_fields = ['created', 'modified', 'created_by', 'linked_project']
 
+    # heavy fields not loaded by list endpoints unless asked for
+    list_excluded_fields = ['echarts_option']
+
+    meta = {
+        'indexes': [
+            # keyset pagination of list endpoints, newest first
+            ('-created', '-id'),
+            ('public', '-created', '-id'),
+            ('created_by', '-created', '-id'),
+            # reverse lookup of delete rule
+            'linked_project',
+        ],
+        'index_background': True,
+    }
+
     @property
     def property_lists(self):
         return ['name', 'created', 'modified', 'created_by',
@@ -22,6 +22,23 @@ class Project(db.Document):
     uneditable_fields = ['created', 'modified', 'created_by',
                          'data_sources', 'share_configs']
 
+    # heavy fields not loaded by list endpoints unless asked for
+    list_excluded_fields = []
+
+    meta = {
+        'indexes': [
+            # keyset pagination of list endpoints, newest first
+            ('-created', '-id'),
+            ('public', '-created', '-id'),
+            ('created_by', '-created', '-id'),
+            # reverse lookups of delete rules
+            'data_sources',
+            'display_schema',
+            'share_configs',
+        ],
+        'index_background': True,
+    }
+
     @property
     def property_lists(self):
         return ['name', 'created', 'modified',
@@ -21,6 +21,16 @@ class ShareConfig(db.Document):
     uneditable_fields = ['created', 'modified',
                          'created_by', 'password_protected', 'password']
 
+    meta = {
+        'indexes': [
+            # keyset pagination of share configs of a user, newest first
+            ('created_by', '-created', '-id'),
+            # reverse lookup of delete rule, and share configs of a project
+            'linked_project',
+        ],
+        'index_background': True,
+    }
+
     # TODO: CHANGE TO PLAIN TEXT
 
     def check_password(self, password):
@@ -0,0 +1,27 @@
+from database import db
+from mongoengine.fields import (DateTimeField, DictField, ListField,
+                                ObjectIdField, StringField)
+
+
+class ShareInstanceView(db.Document):
+    """
+    Everything a share instance needs in one document, rebuilt whenever its share
+    config, project, display schema or data sources are written.
+    """
+    # same id as the share config
+    id = ObjectIdField(primary_key=True)
+    password = StringField(default=None, null=True)
+    project = ObjectIdField(required=True)
+    display_schema_id = ObjectIdField(default=None, null=True)
+    data_source_ids = ListField(ObjectIdField(), default=[])
+
+    # stored fields of display schema and data sources, in their database form
+    display_schema = DictField(default=None, null=True)
+    data_sources = ListField(DictField(), default=[])
+
+    built = DateTimeField(required=True)
+
+    meta = {
+        'indexes': ['project', 'display_schema_id', 'data_source_ids'],
+        'index_background': True,
+    }
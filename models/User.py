@@ -26,6 +26,12 @@ class User(db.Document):
     uneditable_fields = ['email', 'password', 'created',
                          'modified', 'projects', 'data_sources']
 
+    meta = {
+        # reverse lookups of delete rules, `email` and `username` are indexed as unique
+        'indexes': ['projects', 'data_sources'],
+        'index_background': True,
+    }
+
     def hash_password(self):
         self.password = generate_password_hash(self.password).decode('utf8')
 
@@ -4,6 +4,7 @@ from .ShareConfig import ShareConfig
 from .DataSource import DataSource
 from .DisplaySchema import DisplaySchema
 from .Project import Project
+from .ShareInstanceView import ShareInstanceView
 from .User import User
 
 
@@ -0,0 +1,31 @@
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from flask_restful import Resource
+from services import AdminService
+from utils.logger import get_the_logger
+
+from .response_wrapper import response_wrapper
+
+logger = get_the_logger()
+
+
+class AdminUpstreamsResource(Resource):
+    def __init__(self) -> None:
+        super().__init__()
+        self.admin_service = AdminService()
+
+    @response_wrapper
+    @jwt_required()
+    def get(self):
+        """
+        Get circuit breaker states and fetch statistics of upstream hosts
+
+        Raises:
+            ForbiddenError: current user is not an admin
+
+        Returns:
+            dict of upstream status
+        """
+        jwt_id = get_jwt_identity()
+        logger.info('GET upstream status with jwt_id {}'.format(jwt_id))
+
+        return self.admin_service.get_upstream_status(jwt_id)
@@ -4,10 +4,13 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from errors import InvalidParamError
 from services.data_source_service import DataSourcesService
+from utils.etag import document_etag
 from utils.guard import myguard
 from utils.logger import get_the_logger
+from utils.mongo_json import dumps_raw
 
-from .response_wrapper import response_wrapper
+from .response_wrapper import (is_not_modified, json_response, not_modified_response,
+                               page_response, response_wrapper)
 import utils
 logger = get_the_logger()
 
@@ -45,7 +48,8 @@ class DataSourcesResource(Resource):
             data_source_ids = ids.split(',')
             # TODO: add check for IDs
 
-            return self.data_sources_service.get_data_sources_by_ids(data_source_ids, jwt_id)
+            return json_response(dumps_raw(
+                self.data_sources_service.get_data_sources_by_ids(data_source_ids, jwt_id)))
 
         elif query_type == 'filter':
             # prepare `is_public`
@@ -59,7 +63,16 @@ class DataSourcesResource(Resource):
             # prepare `created_by`
             created_by = args.get('created_by')
 
-            return self.data_sources_service.get_data_sources(is_public, created_by, jwt_id)
+            # prepare `fields`, default projection of the endpoint if not provided
+            fields = args.get('fields')
+            fields = [field.strip() for field in fields.split(',')] if fields else None
+
+            # prepare `limit` and `next`, first page of default size if not provided
+            limit = args.get('limit')
+            cursor = args.get('next')
+
+            return page_response(self.data_sources_service.get_data_sources(
+                is_public, created_by, jwt_id, fields, limit, cursor))
         else:
             raise InvalidParamError(
                 'Please provide "query_type" in query. Available inputs: "id_only", "filter".')
@@ -91,6 +104,9 @@ class DataSourcesResource(Resource):
             url = body.get('url')
             slots = body.get('slots')
             examples = body.get('examples')
+            data_paths = body.get('data_paths')
+            cache_ttl = body.get('cache_ttl')
+            refresh_policy = body.get('refresh_policy')
 
             # check type
             utils.myguard.check_literaly.check_type([
@@ -98,10 +114,13 @@ class DataSourcesResource(Resource):
                 (bool, public, 'public', True),
                 (str, description, 'description', True),
                 (str, static_data, 'static_data', True),
-                (str, data_type, 'data_type', False)
+                (str, data_type, 'data_type', False),
+                (list, data_paths, 'data_paths', True),
+                (int, cache_ttl, 'cache_ttl', True),
+                (dict, refresh_policy, 'refresh_policy', True)
             ])
 
-            return self.data_sources_service.create_data_source(name, public, description, static_data, data_type, url, slots, examples, jwt_id)
+            return self.data_sources_service.create_data_source(name, public, description, static_data, data_type, url, slots, examples, data_paths, cache_ttl, refresh_policy, jwt_id)
 
 
 class DataSourceResource(Resource):
@@ -119,7 +138,19 @@ class DataSourceResource(Resource):
         logger.info(
             'GET data_source with id {} and jwt_id {}'.format(id, user_id))
 
-        return self.data_sources_service.get_data_source_by_id(id, query, user_id)
+        if query:
+            # fetched data is not versioned
+            return self.data_sources_service.get_data_source_by_id(id, query, user_id)
+
+        # answer revalidation before loading the data source
+        etag = self.data_sources_service.get_data_source_etag(id, user_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        # read-only, so the data source is not built as a document
+        data_source = self.data_sources_service.get_raw_data_source_by_id(id, user_id)
+        return json_response(dumps_raw(data_source),
+                             document_etag(data_source['_id'], data_source['modified']))
 
     @response_wrapper
     @jwt_required()
@@ -136,6 +167,9 @@ class DataSourceResource(Resource):
         url = body.get('url')
         slots = body.get('slots')
         examples = body.get('examples')
+        data_paths = body.get('data_paths')
+        cache_ttl = body.get('cache_ttl')
+        refresh_policy = body.get('refresh_policy')
 
         # check type
         # TODO: add check for url and slots for all methods
@@ -144,7 +178,10 @@ class DataSourceResource(Resource):
             (bool, public, 'public', True),
             (str, description, 'description', True),
             (str, static_data, 'static_data', True),
-            (str, data_type, 'data_type', True)
+            (str, data_type, 'data_type', True),
+            (list, data_paths, 'data_paths', True),
+            (int, cache_ttl, 'cache_ttl', True),
+            (dict, refresh_policy, 'refresh_policy', True)
         ])
 
         logger.info(
@@ -152,7 +189,7 @@ class DataSourceResource(Resource):
 
         myguard.check_literaly.object_id(id, 'data source id')
 
-        return self.data_sources_service.edit_data_source(id, name, public, description, static_data, data_type, url, slots, examples, jwt_id)
+        return self.data_sources_service.edit_data_source(id, name, public, description, static_data, data_type, url, slots, examples, data_paths, cache_ttl, refresh_policy, jwt_id)
 
     @response_wrapper
     @jwt_required()
@@ -162,3 +199,23 @@ class DataSourceResource(Resource):
             'DELETE data_source with id {} and jwt_id {}'.format(id, user_id))
 
         return self.data_sources_service.delete_data_source(id, user_id)
+
+
+class DataSourceBatchResource(Resource):
+    def __init__(self) -> None:
+        super().__init__()
+        self.data_sources_service = DataSourcesService()
+
+    @response_wrapper
+    @jwt_required(optional=True)
+    def post(self, id):
+        myguard._check.object_id(id)
+        body = request.get_json()
+        jwt_id = get_jwt_identity()
+
+        logger.info(
+            'POST data_source {} batch with body {} and jwt_id {}'.format(id, body, jwt_id))
+
+        queries = body.get('queries')
+
+        return self.data_sources_service.get_batch_data_by_id(id, queries, jwt_id)
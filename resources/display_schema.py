@@ -3,9 +3,12 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from errors import ForbiddenError
 from services import DisplaySchemaService
+from utils.etag import document_etag
+from utils.mongo_json import dumps_raw
 import utils
 
-from .response_wrapper import response_wrapper
+from .response_wrapper import (is_not_modified, json_response, not_modified_response,
+                               page_response, response_wrapper)
 
 
 class DisplaySchemasResource(Resource):
@@ -31,7 +34,16 @@ class DisplaySchemasResource(Resource):
         # prepare `created_by`
         created_by = args.get('created_by')
 
-        return self.display_schema_service.get_display_schemas(is_public, created_by, user_id)
+        # prepare `fields`, default projection of the endpoint if not provided
+        fields = args.get('fields')
+        fields = [field.strip() for field in fields.split(',')] if fields else None
+
+        # prepare `limit` and `next`, first page of default size if not provided
+        limit = args.get('limit')
+        cursor = args.get('next')
+
+        return page_response(self.display_schema_service.get_display_schemas(
+            is_public, created_by, user_id, fields, limit, cursor))
 
     @response_wrapper
     @jwt_required()
@@ -66,7 +78,16 @@ class DisplaySchemaResource(Resource):
     def get(self, id):
         user_id = get_jwt_identity()
 
-        return self.display_schema_service.get_display_schema_by_id(id, user_id)
+        # answer revalidation before loading the display schema
+        etag = self.display_schema_service.get_display_schema_etag(id, user_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        # read-only, so the display schema is not built as a document
+        display_schema = self.display_schema_service.get_raw_display_schema_by_id(
+            id, user_id)
+        return json_response(dumps_raw(display_schema),
+                             document_etag(display_schema['_id'], display_schema['modified']))
 
     @response_wrapper
     @jwt_required(optional=True)
@@ -1,3 +1,4 @@
+from typing import List, Optional
 
 import utils
 from errors import InvalidParamError
@@ -5,14 +6,22 @@ from flask import request
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from services import ProjectService
+from utils.etag import content_etag, document_etag
 from utils.guard import myguard
 from utils.logger import get_the_logger
+from utils.mongo_json import dumps_raw
 
-from .response_wrapper import response_wrapper
+from .response_wrapper import (is_not_modified, json_response, not_modified_response,
+                               page_response, response_wrapper)
 
 logger = get_the_logger()
 
 
+def get_include(args) -> Optional[List[str]]:
+    include = args.get('include')
+    return [field.strip() for field in include.split(',')] if include else None
+
+
 class ProjectsResource(Resource):
     def __init__(self) -> None:
         super().__init__()
@@ -32,6 +41,9 @@ class ProjectsResource(Resource):
         if query_type is None:
             raise InvalidParamError('Please provide "query_type" in query.')
 
+        # prepare `include`, references embedded in projects, none if not provided
+        include = get_include(args)
+
         if query_type == 'id_only':
             # prepare `ids`
             ids = args.get('id')
@@ -45,7 +57,8 @@ class ProjectsResource(Resource):
             project_ids = ids.split(',')
             # TODO: add check for IDs
 
-            return self.project_service.get_projects_by_ids(project_ids, jwt_id)
+            return json_response(dumps_raw(
+                self.project_service.get_projects_by_ids(project_ids, jwt_id, include)))
 
         elif query_type == 'filter':
             # prepare `is_public`
@@ -59,7 +72,16 @@ class ProjectsResource(Resource):
             # prepare `created_by`
             created_by = args.get('created_by')
 
-            return self.project_service.get_projects(is_public, created_by, jwt_id)
+            # prepare `fields`, default projection of the endpoint if not provided
+            fields = args.get('fields')
+            fields = [field.strip() for field in fields.split(',')] if fields else None
+
+            # prepare `limit` and `next`, first page of default size if not provided
+            limit = args.get('limit')
+            cursor = args.get('next')
+
+            return page_response(self.project_service.get_projects(
+                is_public, created_by, jwt_id, fields, limit, cursor, include))
         else:
             raise InvalidParamError(
                 'Please provide "query_type" in query. Available inputs: "id_only", "filter".')
@@ -109,8 +131,25 @@ class ProjectResource(Resource):
     @jwt_required(optional=True)
     def get(self, id):
         user_id = get_jwt_identity()
-
-        return self.project_service.get_project_by_id(id, user_id)
+        include = get_include(request.args)
+
+        if include:
+            # embedded documents change without the project, so the body is versioned
+            project = self.project_service.get_raw_project_by_id(id, user_id, include)
+            body = dumps_raw(project)
+            etag = content_etag(body)
+            if is_not_modified(etag):
+                return not_modified_response(etag)
+            return json_response(body, etag)
+
+        # answer revalidation before loading the project
+        etag = self.project_service.get_project_etag(id, user_id)
+        if is_not_modified(etag):
+            return not_modified_response(etag)
+
+        # read-only, so the project is not built as a document
+        project = self.project_service.get_raw_project_by_id(id, user_id)
+        return json_response(dumps_raw(project), document_etag(project['_id'], project['modified']))
 
     @response_wrapper
     @jwt_required()
@@ -3,16 +3,94 @@ import os
 import traceback
 
 from errors import ServerError
-from flask import Response
+from flask import Response, request
 from flask_jwt_extended.exceptions import NoAuthorizationError
 from jwt import ExpiredSignatureError, InvalidTokenError
 from mongoengine.errors import MongoEngineException
 from utils import get_the_logger
+from utils.compression import (MIN_COMPRESS_BYTES, compress, compress_cached,
+                               get_available_encodings)
+from utils.mongo_json import dumps_raw
 
 logger = get_the_logger()
 env = os.getenv('ENV')
 
 
+def to_json(response) -> str:
+    if type(response) == dict:
+        return json.dumps(response)
+
+    if type(response) == list:
+        # TODO: refine the convertion from List of Document to JSON
+        response_json_list = [x.to_json() for x in response]
+        return '[' + ','.join(response_json_list) + ']'
+
+    return response.to_json()
+
+
+def get_representation_etag(etag: str, encoding: str) -> str:
+    # every content coding of a body is a different representation with its own ETag
+    return etag if encoding is None else '{}-{}'.format(etag, encoding)
+
+
+def negotiate_encoding(body_size: int):
+    if body_size < MIN_COMPRESS_BYTES:
+        return None
+    return request.accept_encodings.best_match(get_available_encodings())
+
+
+def json_response(response_json: str, etag: str = None) -> Response:
+    body = response_json.encode('utf-8')
+    encoding = negotiate_encoding(len(body))
+
+    if encoding is not None:
+        # bodies with an ETag are versioned, so they are compressed once per version
+        body = compress(body, encoding) if etag is None else \
+            compress_cached(body, encoding, etag)
+
+    response = Response(body, mimetype='application/json', status=200)
+    response.vary.add('Accept-Encoding')
+    if encoding is not None:
+        response.headers['Content-Encoding'] = encoding
+    if etag is not None:
+        response.set_etag(get_representation_etag(etag, encoding))
+        # clients may keep the body but must revalidate it before reuse
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def page_response(page) -> Response:
+    # cursor of the next page is sent in a header, so the body stays a plain list
+    response = json_response(dumps_raw(page.items))
+    if page.next_cursor is not None:
+        response.headers['X-Next-Cursor'] = page.next_cursor
+    return response
+
+
+def _get_matched_etag(etag: str):
+    if etag is None:
+        return None
+
+    # `If-None-Match` is compared weakly, as required by RFC 7232
+    for encoding in [None] + get_available_encodings():
+        representation_etag = get_representation_etag(etag, encoding)
+        if request.if_none_match.contains_weak(representation_etag):
+            return representation_etag
+    return None
+
+
+def is_not_modified(etag: str) -> bool:
+    return _get_matched_etag(etag) is not None
+
+
+def not_modified_response(etag: str) -> Response:
+    response = Response(status=304)
+    response.set_etag(_get_matched_etag(etag) or etag)
+    response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 def response_wrapper(func):
     # # ref: https://stackoverflow.com/a/48457726/11071084
     # def to_dict(obj):
@@ -40,20 +118,12 @@ def response_wrapper(func):
         try:
             # get response
             response = func(*args, **kwargs)
-            response_json: str
 
-            if type(response) == dict:
-                response_json = json.dumps(response)
-
-            elif type(response) == list:
-                # TODO: refine the convertion from List of Document to JSON
-                response_json_list = [x.to_json() for x in response]
-                response_json = '[' + ','.join(response_json_list) + ']'
-
-            else:
-                response_json = response.to_json()
+            # responses built by resources, such as 304 Not Modified
+            if isinstance(response, Response):
+                return response
 
-            return Response(response_json, mimetype='application/json', status=200)
+            return json_response(to_json(response))
         except NoAuthorizationError as e:
             # wrap jwt authorization error
             return {'title': 'Forbidden', 'status': 403, 'detail': 'Cannot access with given authorization.'}, 403
@@ -2,8 +2,9 @@ from flask_restful import Api
 
 from resources.share_instance import ShareInstanceResource
 
+from .admin import AdminUpstreamsResource
 from .auth import LoginResource, SignupResource
-from .data_source import DataSourceResource, DataSourcesResource
+from .data_source import DataSourceBatchResource, DataSourceResource, DataSourcesResource
 from .display_schema import DisplaySchemaResource, DisplaySchemasResource
 from .project import (ProjectDataSourcesResource, ProjectDispalySchemaResource, ProjectResource,
                       ProjectsResource)
@@ -27,6 +28,7 @@ def initialize_routes(api: Api):
     # TODO: detailed instructions needed
     api.add_resource(DataSourcesResource, '/data_sources')
     api.add_resource(DataSourceResource, '/data_sources/<id>')
+    api.add_resource(DataSourceBatchResource, '/data_sources/<id>/batch')
 
     api.add_resource(DisplaySchemasResource, '/display_schemas')
     api.add_resource(DisplaySchemaResource, '/display_schemas/<id>')
@@ -45,3 +47,5 @@ def initialize_routes(api: Api):
                      '/share_configs/<id>/password')
 
     api.add_resource(ShareInstanceResource, '/share_instances/<id>')
+
+    api.add_resource(AdminUpstreamsResource, '/admin/upstreams')
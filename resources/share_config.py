@@ -5,8 +5,9 @@ from flask_jwt_extended import get_jwt_identity, jwt_required
 from flask_restful import Resource
 from services.share_config_service import ShareConfigService
 from utils import get_the_logger
+from utils.mongo_json import dumps_raw
 
-from .response_wrapper import response_wrapper
+from .response_wrapper import json_response, page_response, response_wrapper
 
 logger = get_the_logger()
 
@@ -26,13 +27,18 @@ class ShareConfigsResource(Resource):
             NotFoundError: current user not found in database
 
         Returns:
-            list of ShareConfigs
+            list of ShareConfigs, one page of them with the cursor of next page in `X-Next-Cursor`
         """
 
         # check authorization
         jwt_id = get_jwt_identity()
 
-        return self.share_config_service.get_share_configs(jwt_id)
+        # prepare `limit` and `next`, first page of default size if not provided
+        args = request.args
+        limit = args.get('limit')
+        cursor = args.get('next')
+
+        return page_response(self.share_config_service.get_share_configs(jwt_id, limit, cursor))
 
     @response_wrapper
     @jwt_required()
@@ -71,7 +77,9 @@ class ShareConfigResource(Resource):
         if password is not None:
             del body['password']
 
-        return self.share_config_service.get_by_id(id, password=password)
+        # read-only, so the share config is not built as a document
+        return json_response(dumps_raw(
+            self.share_config_service.get_raw_by_id(id, password=password)))
 
     @response_wrapper
     @jwt_required()
@@ -7,7 +7,8 @@ from utils.guard import myguard
 from utils.logger import get_the_logger
 from services import ShareInstanceService
 
-from .response_wrapper import response_wrapper
+from .response_wrapper import (is_not_modified, json_response, not_modified_response,
+                               response_wrapper)
 import utils
 logger = get_the_logger()
 
@@ -33,4 +34,9 @@ class ShareInstanceResource(Resource):
         logger.info(
             'GET share instance with id {}, jwt_id {}, password {} and query {}'.format(id, jwt_id, password, query))
 
-        return self.share_instance_service.get_by_id(id, password, query, jwt_id)
+        rendered = self.share_instance_service.get_by_id(
+            id, password, query, jwt_id)
+        if is_not_modified(rendered.etag):
+            return not_modified_response(rendered.etag)
+
+        return json_response(rendered.body, rendered.etag)
@@ -1,4 +1,5 @@
 
+from .admin_service import AdminService
 from .data_source_service import DataSourcesService
 from .display_schema_service import DisplaySchemaService
 from .project_service import ProjectService
@@ -0,0 +1,37 @@
+from dao.data_source_dao import data_cache, data_refresher, revalidations
+from dao.share_instance_cache import share_instance_cache
+from errors import ForbiddenError
+from utils.config import get_env_list
+from utils.compression import compressed_bodies
+from utils.guard import myguard
+from utils.http_pool import http_session_pool
+
+from services.api_fetch_service import ApiFetchService
+
+# ids of users allowed to inspect server internals
+ADMIN_USER_IDS = set(get_env_list('ADMIN_USER_IDS', []))
+
+
+class AdminService:
+    def __init__(self) -> None:
+        self.api_fetch_service = ApiFetchService()
+
+    def assert_admin(self, jwt_id: str) -> None:
+        myguard.check_literaly.user_id(jwt_id)
+        if jwt_id not in ADMIN_USER_IDS:
+            raise ForbiddenError('Only admins can access this resource.')
+
+    def get_upstream_status(self, jwt_id: str) -> dict:
+        # check authorization
+        self.assert_admin(jwt_id)
+
+        return {
+            'breakers': self.api_fetch_service.get_breaker_states(),
+            'in_flight': self.api_fetch_service.get_flight_waiters(),
+            'sessions': http_session_pool.stats(),
+            'data_cache': data_cache.stats(),
+            'data_refresher': data_refresher.stats(),
+            'revalidations': revalidations.stats(),
+            'share_instance_cache': share_instance_cache.stats(),
+            'compressed_bodies': compressed_bodies.stats(),
+        }
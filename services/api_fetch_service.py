@@ -1,76 +1,182 @@
-import json
+from collections import namedtuple
 from typing import List
 
+import time
+
 import requests
-import utils
-from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
-                    NotFoundError, NotMutableError, UnauthorizedError)
+from urllib3.exceptions import HTTPError as Urllib3HTTPError
+from urllib3.exceptions import ReadTimeoutError as Urllib3ReadTimeoutError
+from errors import (EmailAlreadyExistsError, ForbiddenError, NotFoundError,
+                    NotMutableError, UnauthorizedError, UpstreamError,
+                    UpstreamTimeoutError, UpstreamUnavailableError)
+from utils.circuit_breaker import CircuitBreakerRegistry, CircuitRejectedError
+from utils.config import get_env_float, get_env_int
+from utils.http_pool import (PoolTimeoutError, get_host, http_session_pool,
+                             read_deadline)
+from utils.json_stream import (BodyTooLargeError, CappedReader, DeadlineExceededError,
+                               load_json)
+from utils.single_flight import SingleFlight
+
+from services.slot_binder import SlotBinder
+
+MAX_BODY_BYTES = get_env_int('UPSTREAM_MAX_BODY_BYTES', 10 * 1024 * 1024)
+# seconds to wait for connecting to, and then for each read from, an upstream
+CONNECT_TIMEOUT = get_env_float('UPSTREAM_CONNECT_TIMEOUT', 3.05)
+READ_TIMEOUT = get_env_float('UPSTREAM_READ_TIMEOUT', 10.0)
+# seconds to fetch a whole response, however slowly its body trickles in
+TOTAL_TIMEOUT = get_env_float('UPSTREAM_TOTAL_TIMEOUT', 30.0)
+
+# one breaker per upstream host, so a slow host cannot hold all worker threads
+upstream_breakers = CircuitBreakerRegistry(
+    failure_threshold=get_env_int('UPSTREAM_BREAKER_FAILURE_THRESHOLD', 5),
+    recovery_timeout=get_env_float('UPSTREAM_BREAKER_RECOVERY_TIMEOUT', 30.0),
+    max_in_flight=get_env_int('UPSTREAM_MAX_IN_FLIGHT_PER_HOST', 8))
+
+# parsed upstream body, its size in bytes and its validators, `not_modified` is
+# set if the upstream answered 304 and the body is reused from the previous response
+UpstreamResponse = namedtuple('UpstreamResponse',
+                              ['data', 'size', 'etag', 'last_modified', 'not_modified'],
+                              defaults=[None, None, False])
+
+# concurrent fetches of the same url and params share one upstream request
+upstream_flights = SingleFlight()
 
 
 class ApiFetchService:
+    def resolve_params(self, slots: List[dict], query: dict) -> dict:
+        """
+        Bind a request query to the slots of a data source.
+        Prefer binding with a cached `SlotBinder` when slots are reused.
+
+        Args:
+            slots (List[dict]): slots of the data source
+            query (dict): request query
+
+        Raises:
+            InvalidParamError: raises if slots are invalid or a required slot is missing
+
+        Returns:
+            dict: params to send to the upstream url
+        """
+        return SlotBinder(slots).bind(query)
+
+    def fetch(self, url: str, request_params: dict, data_paths: List[str] = None,
+              previous: UpstreamResponse = None) -> UpstreamResponse:
+        """
+        Fetch JSON from an upstream url.
+
+        Args:
+            url (str): upstream url
+            request_params (dict): resolved request params
+            data_paths (List[str]): dotted paths to keep from the response, keep all if empty
+            previous (UpstreamResponse): last response of the same request, revalidated with its validators if given
+
+        Raises:
+            UpstreamError: raises if upstream is not reachable, does not answer 2xx,
+                or its response is too large or not a JSON
+            UpstreamTimeoutError: raises if upstream does not respond within the connect, read
+                or total timeout
+            UpstreamUnavailableError: raises if upstream is failing or saturated, has no free connection,
+                or answers 5xx or 429
+
+        Returns:
+            UpstreamResponse: parsed data and the size of response body
+        """
+        data_paths = tuple(data_paths or [])
+        headers = self.get_conditional_headers(previous)
+        flight_key = (url, tuple(sorted(request_params.items())), data_paths,
+                      tuple(sorted(headers.items())))
+        return upstream_flights.do(flight_key, self._fetch, url, request_params, data_paths,
+                                   headers, previous)
+
+    def get_conditional_headers(self, previous: UpstreamResponse) -> dict:
+        headers = {}
+        if previous is None:
+            return headers
+
+        if previous.etag:
+            headers['If-None-Match'] = previous.etag
+        if previous.last_modified:
+            headers['If-Modified-Since'] = previous.last_modified
+        return headers
+
+    def _fetch(self, url: str, request_params: dict, data_paths: tuple,
+               headers: dict, previous: UpstreamResponse) -> UpstreamResponse:
+        # fail fast if the upstream host is known to be failing or saturated
+        breaker = upstream_breakers.get(get_host(url))
+        try:
+            probe = breaker.acquire()
+        except CircuitRejectedError as e:
+            raise UpstreamUnavailableError(
+                'Upstream {} is unavailable: {}.'.format(e.name, e.reason))
+
+        is_host_healthy = False
+        deadline = time.monotonic() + TOTAL_TIMEOUT
+        try:
+            # reuse the keep-alive connections of the upstream host
+            with http_session_pool.session(url) as session:
+                with session.get(url=url, params=request_params, headers=headers, stream=True,
+                                 timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+                    # server errors and rate limits tell the host is failing or saturated
+                    is_host_healthy = response.status_code < 500 and response.status_code != 429
+                    etag = response.headers.get('ETag')
+                    last_modified = response.headers.get('Last-Modified')
+
+                    if response.status_code == 304 and headers:
+                        # unchanged upstream, reuse the previous body without reading or parsing
+                        return UpstreamResponse(previous.data, previous.size,
+                                                etag or previous.etag,
+                                                last_modified or previous.last_modified,
+                                                True)
+
+                    # error bodies are never data, so they are neither returned nor cached
+                    if not is_host_healthy:
+                        raise UpstreamUnavailableError('Upstream {} answered {}.'.format(
+                            url, response.status_code))
+                    if not 200 <= response.status_code < 300:
+                        raise UpstreamError('Upstream {} answered {}.'.format(
+                            url, response.status_code))
+
+                    # refuse declared oversize bodies before reading any of them
+                    content_length = response.headers.get('Content-Length')
+                    if content_length and content_length.isdigit() and int(content_length) > MAX_BODY_BYTES:
+                        raise BodyTooLargeError(MAX_BODY_BYTES)
+
+                    # parse while reading from the socket, cut off at the deadline
+                    response.raw.decode_content = True
+                    reader = CappedReader(response.raw, MAX_BODY_BYTES, deadline)
+                    with read_deadline(response, deadline):
+                        data = load_json(reader, list(data_paths))
+        except (requests.Timeout, Urllib3ReadTimeoutError, DeadlineExceededError):
+            # timeouts of connecting, of each read including those of the body, and of the whole fetch
+            is_host_healthy = False
+            raise UpstreamTimeoutError('Upstream {} did not respond in time.'.format(url))
+        except (requests.RequestException, Urllib3HTTPError):
+            # connection errors, including those while reading body
+            is_host_healthy = False
+            raise UpstreamError('Cannot fetch data from {}.'.format(url))
+        except PoolTimeoutError as e:
+            raise UpstreamUnavailableError(
+                'Upstream {} has no free connection.'.format(e.host))
+        except BodyTooLargeError:
+            raise UpstreamError('Response from {} is larger than {} bytes.'.format(
+                url, MAX_BODY_BYTES))
+        except ValueError:
+            raise UpstreamError(
+                'Response from {} is not a valid JSON.'.format(url))
+        finally:
+            breaker.release(success=is_host_healthy, probe=probe)
+
+        return UpstreamResponse(data, reader.bytes_read, etag, last_modified)
+
+    def get_breaker_states(self) -> dict:
+        return upstream_breakers.stats()
+
+    def get_flight_waiters(self) -> List[dict]:
+        return [{'url': url, 'params': dict(params), 'data_paths': list(data_paths),
+                 'conditional': bool(headers), 'waiters': waiters}
+                for (url, params, data_paths, headers), waiters in upstream_flights.waiters().items()]
+
     def get_data(self, url, slots: List[dict], query: dict) -> dict:
-        request_params = {}
-
-        for slot in slots:
-            name, type, optional, default, alias = [
-                slot.get(x) for x in ['name', 'slot_type', 'optional', 'default', 'alias']]
-
-            utils.myguard.check_literaly.check_type([
-                (str, name, 'name', False),
-                (str, type, 'slot_type', False),
-                (bool, optional, 'optional', True),
-                (str, default, 'default', True),
-                (str, alias, 'alias', True),
-            ])
-
-            param_name = alias if alias else name
-            if param_name in request_params:
-                raise InvalidParamError(
-                    'Slot "{}" contains duplicate param names or aliases.'.format(name))
-
-            if not optional:
-                # field is required
-                if param_name not in query:
-                    raise InvalidParamError(
-                        'Please provide {} in query.'.format(name))
-
-                request_params[name] = query[param_name]
-            else:
-                # field is optional
-                if param_name in query:
-                    request_params[name] = query[param_name]
-                elif default:
-                    request_params[name] = default
-
-        response = requests.get(url=url, params=request_params)
-        return json.loads(response.text)
-
-        if 'api.weatherapi.com' in url:
-            return self.weather_api.get_data_for_one(query=query)
-
-
-class WeatherAPI():
-    def __init__(self) -> None:
-        # load_dotenv()
-        # self.weather_api_key = os.getenv('WEATHER_API_KEY')
-        # self.url = 'https://api.weatherapi.com/v1/current.json'.format(
-        #     self.weather_api_key)
-        pass
-
-    @classmethod
-    def check_status_code(cls, response: requests.Response):
-        if response.status_code != 200:
-            # raise Exception
-            print('status_code: {}'.format(response.status_code))
-            pass
-
-    def get_data_for_one(self, query: dict = {}) -> dict:
-        response = requests.get(url=self.url, params=query)
-        # WeatherAPI.check_status_code(response)
-        return json.loads(response.text)
-
-    def get_data(self, queries: dict = {}) -> dict:
-        ret = {}
-        for idx, query in queries.items():
-            ret[idx] = self.get_data_for_one(query=query)
-        return ret
+        request_params = self.resolve_params(slots, query)
+        return self.fetch(url, request_params).data
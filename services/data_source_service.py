@@ -1,20 +1,32 @@
 import datetime
 import json
 import os
-from typing import List
+from typing import List, Optional
 
 import utils
 from dao.data_source_dao import DataSourceDao
 from dao.project_dao import ProjectDao
 from dao.user_dao import UserDao
 from errors import (ForbiddenError, InvalidParamError, NotFoundError,
-                    NotMutableError)
+                    NotMutableError, UpstreamTimeoutError)
 from models import DataSource, User
 from models.Project import Project
 from mongoengine.errors import DoesNotExist, ValidationError
+from utils.concurrency import describe_error, run_concurrently
+from utils.config import get_env_float, get_env_int
+from utils.etag import readable_document_etag
 from utils.guard import myguard
+from utils.ownership import is_created_by
+from utils.pagination import Page, paginate
 
 from services.api_fetch_service import ApiFetchService
+from services.slot_binder import get_converter
+
+BATCH_MAX_QUERIES = get_env_int('DATA_SOURCE_BATCH_MAX_QUERIES', 50)
+# queries of a batch fetched at the same time, kept below the per-host in-flight limit
+BATCH_FETCH_CONCURRENCY = get_env_int('DATA_SOURCE_BATCH_CONCURRENCY', 4)
+# seconds to wait for all queries of a batch
+BATCH_FETCH_DEADLINE = get_env_float('DATA_SOURCE_BATCH_DEADLINE', 10.0)
 
 
 class DataSourcesService:
@@ -29,6 +41,7 @@ class DataSourcesService:
         check if every slot contains a unique name considering alias.
         If alias exists, alias connot start from "_".
         If alias not exists, name cannot start from "_".
+        If default exists, it should be of the slot type.
         '''
 
         utils.myguard.check_literaly.check_type([
@@ -62,13 +75,32 @@ class DataSourcesService:
                 raise InvalidParamError(
                     'Slot "{}" contains duplicate param names or aliases.'.format(name))
 
+            default = slot.get('default')
+            if default:
+                convert, type_name = get_converter(slot.get('slot_type', 'string'))
+                try:
+                    convert(default)
+                except (TypeError, ValueError):
+                    raise InvalidParamError('Default of slot "{}" should be of type {}.'.format(
+                        name, type_name))
+
             available_params.add(param_name)
 
+    def _assert_cache_ttl(self, cache_ttl: Optional[int]):
+        '''
+        check if cache_ttl is a positive number of seconds when provided.
+        '''
+        if cache_ttl is not None and cache_ttl <= 0:
+            raise InvalidParamError('"cache_ttl" should be a positive integer.')
+
     def get_data_sources(self,
                          is_public: bool,
                          created_by: str,
                          #  data_source_ids: List[str],
-                         jwt_id: str) -> List[DataSource]:
+                         jwt_id: str,
+                         fields: Optional[List[str]] = None,
+                         limit: Optional[str] = None,
+                         cursor: Optional[str] = None) -> Page:
         # validate args and construct query dict
         query = {}
 
@@ -101,28 +133,34 @@ class DataSourcesService:
         # except ValidationError as e:
         #     raise InvalidParamError('ParamError')
 
-        data_sources = DataSource.objects(**query)
-        return data_sources
+        data_sources = self.data_source_dao.apply_projection(
+            DataSource.objects(**query), fields)
+        return paginate(data_sources, limit, cursor)
 
-    def get_data_sources_by_ids(self, ids: List[int], jwt_id) -> DataSource:
+    def get_data_sources_by_ids(self, ids: List[int], jwt_id) -> List[dict]:
         # check if input contains duplicate ids
         set_ids = set(ids)
         if len(set_ids) != len(ids):
             raise InvalidParamError('Input contains duplicate ids.')
 
-        # get jwt user
-        jwt_user = self.user_dao.get_user_by_id(jwt_id)
-
-        data_sources = self.data_source_dao.get_by_ids(ids)
+        # raw documents, for read-only responses
+        data_sources = self.data_source_dao.get_by_ids(ids, raw=True)
 
         # check auth
         for data_source in data_sources:
-            if not data_source['public'] and data_source['created_by'] != jwt_user:
+            if not data_source.get('public') and not is_created_by(data_source, jwt_id):
                 raise ForbiddenError(
-                    'Cannot access with given authorization for data_source {}'.format(data_source['id']))
+                    'Cannot access with given authorization for data_source {}'.format(data_source['_id']))
 
         return data_sources
 
+    def get_data_source_etag(self, id, jwt_id) -> Optional[str]:
+        """
+        ETag of a data source readable by jwt user, without loading the data source.
+        None if authorization needs the full check.
+        """
+        return readable_document_etag(self.data_source_dao.get_version(id), jwt_id)
+
     def get_data_source_by_id(self, id, query: dict, jwt_id) -> DataSource:
         # query data source via id
         data_source = self.data_source_dao.get_by_id(id)
@@ -130,9 +168,8 @@ class DataSourcesService:
         # check authorization
         if not data_source.public:
             myguard._check.user_id(jwt_id)
-            user = self.user_dao.get_user_by_id(jwt_id)
 
-            if not data_source.created_by == user:
+            if not is_created_by(data_source, jwt_id):
                 raise ForbiddenError()
 
         if query:
@@ -140,6 +177,66 @@ class DataSourcesService:
 
         return data_source
 
+    def get_raw_data_source_by_id(self, id, jwt_id) -> dict:
+        """
+        Same as `get_data_source_by_id` without query, with the data source as a raw
+        document for read-only responses.
+        """
+        data_source = self.data_source_dao.get_raw_by_id(id)
+
+        # check authorization
+        if not data_source.get('public'):
+            myguard._check.user_id(jwt_id)
+
+            if not is_created_by(data_source, jwt_id):
+                raise ForbiddenError()
+
+        return data_source
+
+    def get_batch_data_by_id(self, id, queries: List[dict], jwt_id) -> dict:
+        """
+        Fetch data of a data source for many request queries concurrently.
+
+        Args:
+            id (str): data source id
+            queries (List[dict]): request queries, each resolved against the slots of data source
+            jwt_id (str): id of the jwt user
+
+        Returns:
+            dict: `results` in the order of queries, each with either `data` or `error`
+        """
+        utils.myguard.check_literaly.check_type([
+            (list, queries, 'queries', False)
+        ])
+        if not queries:
+            raise InvalidParamError('Please provide at least one query in "queries".')
+        if len(queries) > BATCH_MAX_QUERIES:
+            raise InvalidParamError('At most {} queries are allowed in a batch.'.format(
+                BATCH_MAX_QUERIES))
+        for idx, query in enumerate(queries):
+            utils.myguard.check_literaly.check_type([
+                (dict, query, 'queries[{}]'.format(idx), False)
+            ])
+
+        # checks authorization, and fetches nothing without query
+        data_source = self.get_data_source_by_id(id, None, jwt_id)
+
+        def get_fetch_task(query: dict):
+            return lambda: self.data_source_dao.get_data(data_source, query)
+
+        def get_timeout_error(idx: int):
+            return UpstreamTimeoutError('Query {} did not respond in {} seconds.'.format(
+                idx, BATCH_FETCH_DEADLINE))
+
+        outcomes = run_concurrently(
+            [get_fetch_task(query) for query in queries],
+            timeout=BATCH_FETCH_DEADLINE,
+            timeout_error=get_timeout_error,
+            max_concurrency=BATCH_FETCH_CONCURRENCY)
+
+        return {'results': [{'data': data} if error is None else {'error': describe_error(error)}
+                            for data, error in outcomes]}
+
     def create_data_source(self,
                            name: str,
                            public: bool,
@@ -149,6 +246,9 @@ class DataSourcesService:
                            url: str,
                            slots: list,
                            examples: list,
+                           data_paths: list,
+                           cache_ttl: int,
+                           refresh_policy: dict,
                            jwt_id: str) -> DataSource:
 
         # check if in development mode
@@ -162,9 +262,10 @@ class DataSourcesService:
         body = {}
 
         params = [name, public, description,
-                  static_data, data_type, url, slots, examples]
+                  static_data, data_type, url, slots, examples, data_paths, cache_ttl, refresh_policy]
         param_names = ['name', 'public',
-                       'description', 'static_data', 'data_type', 'url', 'slots', 'examples']
+                       'description', 'static_data', 'data_type', 'url', 'slots', 'examples', 'data_paths',
+                       'cache_ttl', 'refresh_policy']
 
         for param_name, param in zip(param_names, params):
             if param is not None:
@@ -172,6 +273,7 @@ class DataSourcesService:
 
         # check if every slot contains a unique name
         self._assert_slots(slots)
+        self._assert_cache_ttl(cache_ttl)
 
         # pre-validate params
         # construct new data source object
@@ -205,6 +307,9 @@ class DataSourcesService:
                          url: str,
                          slots: list,
                          examples: list,
+                         data_paths: list,
+                         cache_ttl: int,
+                         refresh_policy: dict,
                          jwt_id) -> DataSource:
 
         # check if contains uneditable params
@@ -221,9 +326,10 @@ class DataSourcesService:
         body = {}
 
         params = [name, public, description,
-                  static_data, data_type, url, slots, examples]
+                  static_data, data_type, url, slots, examples, data_paths, cache_ttl, refresh_policy]
         param_names = ['name', 'public',
-                       'description', 'static_data', 'data_type', 'url', 'slots', 'examples']
+                       'description', 'static_data', 'data_type', 'url', 'slots', 'examples', 'data_paths',
+                       'cache_ttl', 'refresh_policy']
 
         for param_name, param in zip(param_names, params):
             if param is not None:
@@ -231,6 +337,7 @@ class DataSourcesService:
 
         # check if every slot contains a unique name
         self._assert_slots(slots)
+        self._assert_cache_ttl(cache_ttl)
 
         # query project via id
         data_source = self.data_source_dao.get_by_id(id)
@@ -238,9 +345,7 @@ class DataSourcesService:
         # check authorization
         myguard.check_literaly.user_id(jwt_id)
 
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if data_source.created_by != user:
+        if not is_created_by(data_source, jwt_id):
             raise ForbiddenError()
 
         # Forbid changing immutable field
@@ -258,9 +363,7 @@ class DataSourcesService:
         data_source = self.data_source_dao.get_by_id(id)
 
         # check authorization
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if data_source.created_by != user:
+        if not is_created_by(data_source, jwt_id):
             raise ForbiddenError()
 
         # delete project
@@ -272,25 +375,22 @@ class DataSourcesService:
         # TODO: need some tests
         # TODO: need an API to implement it
 
-        user = self.user_dao.get_user_by_id(jwt_id)
-        if (data_source.created_by != user) or (project.created_by != user):
+        if not is_created_by(data_source, jwt_id) or not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
-        self.project_dao.add_data_source(project, data_source)
-        project = self.project_dao.get_by_id(project.pk)
-        return project
+        return self.project_dao.add_data_source(project, data_source)
 
     def clone_by_id(self, data_source_id: str, jwt_id: str) -> DataSource:
-        # get current jwt user
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # get data_source
         data_source = self.data_source_dao.get_by_id(data_source_id)
 
         # check authorization
-        if not data_source.public and data_source.created_by != user:
+        if not data_source.public and not is_created_by(data_source, jwt_id):
             raise ForbiddenError()
 
+        # get current jwt user, referenced by the clone
+        user = self.user_dao.get_user_by_id(jwt_id)
+
         # get a clone
         new_data_source = self.data_source_dao.get_a_copy(data_source)
 
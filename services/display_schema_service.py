@@ -1,6 +1,6 @@
 
 import datetime
-from typing import List
+from typing import List, Optional
 
 from dao import (DataSourceDao, DisplaySchemaDao, ProjectDao, ShareConfigDao,
                  UserDao)
@@ -8,7 +8,10 @@ from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
 from mongoengine.errors import DoesNotExist, NotUniqueError, ValidationError
+from utils.etag import readable_document_etag
 from utils.guard import myguard
+from utils.ownership import is_created_by
+from utils.pagination import Page, paginate
 
 
 class DisplaySchemaService:
@@ -21,7 +24,10 @@ class DisplaySchemaService:
     def get_display_schemas(self,
                             is_public: bool,
                             created_by: str,
-                            jwt_id: str) -> List[DisplaySchema]:
+                            jwt_id: str,
+                            fields: Optional[List[str]] = None,
+                            limit: Optional[str] = None,
+                            cursor: Optional[str] = None) -> Page:
         # validate args and construct query dict
         query = {}
 
@@ -30,16 +36,15 @@ class DisplaySchemaService:
 
         if created_by is not None:
             # check authorization
-            user = self.user_dao.get_user_by_id(jwt_id)
-
-            if created_by != str(user.id):
+            if created_by != str(jwt_id):
                 raise ForbiddenError()
-            query['created_by'] = user
+            query['created_by'] = created_by
 
         # query display schemas with query dict
-        display_schemas = DisplaySchema.objects(**query)
+        display_schemas = self.display_schema_dao.apply_projection(
+            DisplaySchema.objects(**query), fields)
 
-        return display_schemas
+        return paginate(display_schemas, limit, cursor)
 
     def create_display_schema(self,
                               name: str,
@@ -96,15 +101,33 @@ class DisplaySchemaService:
 
         return display_schema
 
+    def get_display_schema_etag(self, id, jwt_id) -> Optional[str]:
+        """
+        ETag of a display schema readable by jwt user, without loading the display schema.
+        None if authorization needs the full check.
+        """
+        return readable_document_etag(self.display_schema_dao.get_version(id), jwt_id)
+
     def get_display_schema_by_id(self, id, jwt_id) -> DisplaySchema:
         # query data source via id
         display_schema = self.display_schema_dao.get_by_id(id)
 
         # check authorization
-        if not display_schema.public:
-            user = self.user_dao.get_user_by_id(jwt_id)
-            if not display_schema.created_by == user:
-                raise ForbiddenError()
+        if not display_schema.public and not is_created_by(display_schema, jwt_id):
+            raise ForbiddenError()
+
+        return display_schema
+
+    def get_raw_display_schema_by_id(self, id, jwt_id) -> dict:
+        """
+        Same as `get_display_schema_by_id`, with the display schema as a raw document
+        for read-only responses.
+        """
+        display_schema = self.display_schema_dao.get_raw_by_id(id)
+
+        # check authorization
+        if not display_schema.get('public') and not is_created_by(display_schema, jwt_id):
+            raise ForbiddenError()
 
         return display_schema
 
@@ -120,9 +143,7 @@ class DisplaySchemaService:
         display_schema = self.display_schema_dao.get_by_id(id)
 
         # check authorization
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if display_schema.created_by != user:
+        if not is_created_by(display_schema, jwt_id):
             raise ForbiddenError()
 
         # pack body
@@ -158,12 +179,10 @@ class DisplaySchemaService:
         display_schema = self.display_schema_dao.get_by_id(id)
 
         # check authorization
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if display_schema.created_by != user:
+        if not is_created_by(display_schema, jwt_id):
             raise ForbiddenError()
 
-        # delete project
-        display_schema.delete()
+        # delete display schema
+        self.display_schema_dao.delete(display_schema)
 
         return {}
@@ -0,0 +1,165 @@
+import json
+import re
+from typing import List
+
+from errors import InvalidParamError
+
+# `{{ data.<data source id>.series }}`, `{{ query.city }}`
+PLACEHOLDER = re.compile(r'{{\s*([^{}\s]+)\s*}}')
+
+_MISSING = object()
+
+
+def _resolve(context, path: List[str]):
+    value = context
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key, _MISSING)
+        elif isinstance(value, list) and key.lstrip('-').isdigit() \
+                and -len(value) <= int(key) < len(value):
+            value = value[int(key)]
+        else:
+            return _MISSING
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+class _Binding:
+    # a string that is exactly one placeholder, replaced by the bound value of any type
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.keys = path.split('.')
+
+    def render(self, context: dict, missing: set):
+        value = _resolve(context, self.keys)
+        if value is _MISSING:
+            missing.add(self.path)
+            return None
+        return value
+
+
+class _Interpolation:
+    # a string mixing text and placeholders, bound values are formatted into it
+    def __init__(self, parts: list) -> None:
+        self.parts = parts
+
+    def render(self, context: dict, missing: set) -> str:
+        texts = []
+        for part in self.parts:
+            if isinstance(part, _Binding):
+                value = part.render(context, missing)
+                texts.append('' if value is None else
+                             value if isinstance(value, str) else json.dumps(value))
+            else:
+                texts.append(part)
+        return ''.join(texts)
+
+
+class _Dict:
+    # static items are kept as they are, only bound items are rendered
+    def __init__(self, items: dict, bound: dict) -> None:
+        self.items = items
+        self.bound = bound
+
+    def render(self, context: dict, missing: set) -> dict:
+        result = {}
+        for key, item in self.items.items():
+            node = self.bound.get(key)
+            result[key] = item if node is None else node.render(context, missing)
+        return result
+
+
+class _List:
+    def __init__(self, items: list, bound: dict) -> None:
+        self.items = items
+        self.bound = bound
+
+    def render(self, context: dict, missing: set) -> list:
+        result = list(self.items)
+        for idx, node in self.bound.items():
+            result[idx] = node.render(context, missing)
+        return result
+
+
+def _compile_string(text: str):
+    matches = list(PLACEHOLDER.finditer(text))
+    if not matches:
+        return None
+
+    if len(matches) == 1 and matches[0].span() == (0, len(text)):
+        return _Binding(matches[0].group(1))
+
+    parts = []
+    end = 0
+    for match in matches:
+        if match.start() > end:
+            parts.append(text[end:match.start()])
+        parts.append(_Binding(match.group(1)))
+        end = match.end()
+    if end < len(text):
+        parts.append(text[end:])
+    return _Interpolation(parts)
+
+
+def _compile(value):
+    """
+    Compile a parsed JSON value. Returns None if the value contains no placeholders.
+    """
+    if isinstance(value, str):
+        return _compile_string(value)
+
+    if isinstance(value, dict):
+        bound = {}
+        for key, item in value.items():
+            node = _compile(item)
+            if node is not None:
+                bound[key] = node
+        return _Dict(value, bound) if bound else None
+
+    if isinstance(value, list):
+        bound = {}
+        for idx, item in enumerate(value):
+            node = _compile(item)
+            if node is not None:
+                bound[idx] = node
+        return _List(value, bound) if bound else None
+
+    return None
+
+
+class OptionTemplate:
+    """
+    An ECharts option JSON compiled into a template.
+
+    The option is parsed once. A string which is exactly one `{{ path }}` placeholder
+    is replaced by the bound value as is, placeholders inside longer strings are
+    formatted into them. Paths are dotted keys or list indexes into the render context.
+    Parts of the option without placeholders are shared by all renders and must
+    not be mutated.
+    """
+
+    def __init__(self, echarts_option: str) -> None:
+        try:
+            self.option = json.loads(echarts_option)
+        except (TypeError, ValueError):
+            raise InvalidParamError('echarts_option should be a valid JSON.')
+
+        self.root = _compile(self.option)
+
+    def render(self, context: dict):
+        """
+        Fill the placeholders with values from context.
+
+        Args:
+            context (dict): values to bind, such as `data` and `query`
+
+        Returns:
+            Tuple[object, List[str]]: rendered option, and paths of placeholders not found in context
+        """
+        if self.root is None:
+            return self.option, []
+
+        missing = set()
+        option = self.root.render(context, missing)
+        return option, sorted(missing)
@@ -1,5 +1,5 @@
 import datetime
-from typing import List
+from typing import List, Optional
 
 from dao import (DataSourceDao, DisplaySchemaDao, ProjectDao, ShareConfigDao,
                  UserDao)
@@ -7,7 +7,10 @@ from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
                     NotFoundError, NotMutableError, UnauthorizedError)
 
 from models import (DataSource, DisplaySchema, Project, ShareConfig, User)
+from utils.etag import readable_document_etag
 from utils.logger import get_the_logger
+from utils.ownership import is_created_by
+from utils.pagination import Page, paginate
 
 logger = get_the_logger()
 
@@ -23,7 +26,11 @@ class ProjectService():
     def get_projects(self,
                      is_public: bool,
                      created_by: str,
-                     jwt_id) -> List[Project]:
+                     jwt_id,
+                     fields: Optional[List[str]] = None,
+                     limit: Optional[str] = None,
+                     cursor: Optional[str] = None,
+                     include: Optional[List[str]] = None) -> Page:
 
         # validate args and construct query dict
         query = {}
@@ -33,48 +40,119 @@ class ProjectService():
 
         if created_by is not None:
             # check authorization
-            user = self.user_dao.get_user_by_id(jwt_id)
-
-            if created_by != str(user.id):
+            if created_by != str(jwt_id):
                 raise ForbiddenError()
-            query['created_by'] = user
+            query['created_by'] = created_by
 
         # query projects with query dict
-        projects = Project.objects(**query)
+        projects = self.project_dao.apply_projection(
+            Project.objects(**query), fields)
 
-        return projects
+        page = paginate(projects, limit, cursor)
+        self.include_references(page.items, include, jwt_id)
+        return page
+
+    def get_project_etag(self, id, jwt_id) -> Optional[str]:
+        """
+        ETag of a project readable by jwt user, without loading the project.
+        None if authorization needs the full check.
+        """
+        return readable_document_etag(self.project_dao.get_version(id), jwt_id)
 
     def get_project_by_id(self, id, jwt_id) -> Project:
         # query project via id
         project = self.project_dao.get_by_id(id)
 
         # check authorization
-        if not project.public:
-            user = self.user_dao.get_user_by_id(jwt_id)
-            if project.created_by != user:
-                raise ForbiddenError()
+        if not project.public and not is_created_by(project, jwt_id):
+            raise ForbiddenError()
 
         return project
 
+    def get_raw_project_by_id(self, id, jwt_id, include: Optional[List[str]] = None) -> dict:
+        """
+        Same as `get_project_by_id`, with the project as a raw document for read-only responses.
+        """
+        project = self.project_dao.get_raw_by_id(id)
+
+        # check authorization
+        if not project.get('public') and not is_created_by(project, jwt_id):
+            raise ForbiddenError()
+
+        self.include_references([project], include, jwt_id)
+        return project
+
+    def include_references(self,
+                           projects: List[dict],
+                           include: Optional[List[str]],
+                           jwt_id) -> None:
+        """
+        Embed referenced documents into raw projects, in place.
+        Each referenced collection is read with one `$in` query for all projects.
+        References not readable by jwt user are left as ids.
+
+        Args:
+            projects (List[dict]): raw projects
+            include (List[str]): reference fields to resolve, among
+                `data_sources`, `display_schema` and `share_configs`
+            jwt_id: id of jwt user
+
+        Raises:
+            InvalidParamError: raises if a reference field cannot be included
+        """
+        if not include:
+            return
+
+        daos = {'data_sources': self.data_source_dao,
+                'display_schema': self.display_schema_dao,
+                'share_configs': self.share_config_dao}
+
+        unknown_fields = [field for field in include if field not in daos]
+        if unknown_fields:
+            raise InvalidParamError(
+                'Unknown include {} of project.'.format(unknown_fields))
+
+        for field in dict.fromkeys(include):
+            # ids referenced by all projects, resolved at once
+            ids = set()
+            for project in projects:
+                value = project.get(field)
+                if isinstance(value, list):
+                    ids.update(value)
+                elif value is not None:
+                    ids.add(value)
+
+            # share configs have no `public`, only their creator can read them
+            documents = {id: document
+                         for id, document in daos[field].get_raw_by_id_set(ids).items()
+                         if document.get('public') or is_created_by(document, jwt_id)}
+
+            for project in projects:
+                value = project.get(field)
+                if isinstance(value, list):
+                    project[field] = [documents.get(id, id) for id in value]
+                elif value is not None:
+                    project[field] = documents.get(value, value)
+
     def get_projects_by_ids(self,
                             ids: List[str],
-                            jwt_id: str) -> Project:
+                            jwt_id: str,
+                            include: Optional[List[str]] = None) -> List[dict]:
         # check if input contains duplicate ids
         set_ids = set(ids)
         if len(set_ids) != len(ids):
             raise InvalidParamError('Input contains duplicate ids.')
 
-        # get jwt user
-        jwt_user = self.user_dao.get_user_by_id(jwt_id)
-
-        projects = self.project_dao.get_by_ids(ids)
+        # raw documents, for read-only responses
+        projects = self.project_dao.get_by_ids(ids, raw=True)
 
         # check auth
         for project in projects:
-            if not project['public'] and project['created_by'] != jwt_user:
+            if not project.get('public') and not is_created_by(project, jwt_id):
                 raise ForbiddenError(
-                    'Cannot access with given authorization for project {}'.format(project['id']))
+                    'Cannot access with given authorization for project {}'.format(project['_id']))
 
+        self.include_references(projects, include, jwt_id)
         return projects
 
     def create_project(self,
@@ -107,7 +185,7 @@ class ProjectService():
                     if is_public:
                         raise InvalidParamError(
                             'Cannot create a public project with private data source!')
-                    if data_source.created_by.id != user.id:
+                    if not is_created_by(data_source, user.pk):
                         raise ForbiddenError()
 
                 data_source_list.append(data_source)
@@ -122,7 +200,7 @@ class ProjectService():
                 if is_public:
                     raise InvalidParamError(
                         'Cannot create a public project with private display schema!')
-                if display_schema.created_by.id != user.id:
+                if not is_created_by(display_schema, user.pk):
                     raise ForbiddenError()
 
             body['display_schema'] = display_schema
@@ -147,13 +225,11 @@ class ProjectService():
         return project
 
     def edit_project(self, id, public, jwt_id) -> Project:
-        # check auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # query project via id
         project = self.project_dao.get_by_id(id)
 
-        if project.created_by != user:
+        # check auth
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
         body = {}
@@ -169,14 +245,11 @@ class ProjectService():
         return project
 
     def delete_project(self, id: str, jwt_id: str) -> dict:
-        # check auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # query project via id
         project = self.project_dao.get_by_id(id)
 
         # check authorization
-        if project.created_by != user:
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
         # delete project
@@ -185,63 +258,56 @@ class ProjectService():
         return {}
 
     def add_data_sources(self, project_id: str, data_source_ids: List[str], jwt_id: str):
-        # check authorization
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # query project
         project = self.project_dao.get_by_id(project_id)
-        if project.created_by != user:
+
+        # check authorization
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
-        # query data_sources
-        data_sources = []
+        # query owners of data_sources at once
+        data_sources = self.data_source_dao.get_by_ids(
+            data_source_ids, raw=True, fields=['created_by'])
 
-        for data_source_id in data_source_ids:
-            data_source = self.data_source_dao.get_by_id(data_source_id)
-            # check authorization
-            if data_source.created_by != user:
+        # check authorization
+        for data_source in data_sources:
+            if not is_created_by(data_source, jwt_id):
                 raise ForbiddenError()
-            data_sources.append(data_source)
 
-        self.project_dao.add_data_sources(project, data_sources)
-
-        # re-query project
-        project = self.project_dao.get_by_id(project_id)
-        return project
+        # updated project is returned by the write, no re-query
+        return self.project_dao.add_data_sources(
+            project, [data_source['_id'] for data_source in data_sources])
 
     def remove_data_sources(self, project_id: str, data_source_ids: List[str], jwt_id: str):
-        # check authorization
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # query project
         project = self.project_dao.get_by_id(project_id)
-        if project.created_by != user:
+
+        # check authorization
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
-        # query data_sources
-        data_sources = []
+        # query owners of data_sources at once
+        data_sources = self.data_source_dao.get_by_ids(
+            data_source_ids, raw=True, fields=['created_by'])
 
-        for data_source_id in data_source_ids:
-            data_source = self.data_source_dao.get_by_id(data_source_id)
-            # check authorization
-            if data_source.created_by != user:
+        # check authorization
+        for data_source in data_sources:
+            if not is_created_by(data_source, jwt_id):
                 raise ForbiddenError()
-            data_sources.append(data_source)
 
-        self.project_dao.remove_data_sources(project, data_sources)
-
-        # re-query project
-        project = self.project_dao.get_by_id(project_id)
-        return project
+        # updated project is returned by the write, no re-query
+        return self.project_dao.remove_data_sources(
+            project, [data_source['_id'] for data_source in data_sources])
 
     def shallow_copy(self, project_id: str, jwt_id: str) -> Project:
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # query project
         project = self.project_dao.get_by_id(project_id)
-        if project.created_by != user:
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError()
 
+        # get current jwt user, referenced by the copy
+        user = self.user_dao.get_user_by_id(jwt_id)
+
         display_schema = getattr(project, 'display_schema', None)
 
         # get a shallow copy
@@ -273,30 +339,17 @@ class ProjectService():
 
         project = self.project_dao.get_by_id(project_id)
         display_schema = self.display_schema_dao.get_by_id(display_schema_id)
-        jwt_user = self.user_dao.get_user_by_id(jwt_id)
 
-        if project.created_by != jwt_user:
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError(
                 'This project was not created by current user')
 
-        if display_schema.created_by != jwt_user:
+        if not is_created_by(display_schema, jwt_id):
             raise ForbiddenError(
                 'This display schema was not created by current user')
 
-        old_display_schema = project.display_schema
-        old_project = display_schema.linked_project
-
-        if old_display_schema:
-            self.display_schema_dao.modify(
-                old_display_schema, {'linked_project': None})
-
-        if old_project:
-            self.project_dao.modify(
-                old_project, {'display_schema': None})
-
-        self.project_dao.modify(
-            project, {'display_schema': display_schema})
-        self.display_schema_dao.modify(
-            display_schema, {'linked_project': project})
+        self.project_dao.link_display_schema(project, display_schema)
 
+        # re-query project
+        project = self.project_dao.get_by_id(project_id)
         return project
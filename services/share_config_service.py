@@ -1,16 +1,36 @@
 import datetime
-from typing import List
+import json
+from collections import namedtuple
+from typing import List, Optional
 
 from dao import (DataSourceDao, DisplaySchemaDao, ProjectDao, ShareConfigDao,
-                 UserDao)
+                 ShareInstanceViewDao, UserDao)
+from dao.share_instance_cache import get_dependency, share_instance_cache
 from errors import (EmailAlreadyExistsError, ForbiddenError, InvalidParamError,
-                    NotFoundError, NotMutableError, UnauthorizedError)
+                    NotFoundError, NotMutableError,
+                    UnauthorizedError, UpstreamTimeoutError)
 from models import DataSource, DisplaySchema, Project, ShareConfig, User
+from utils.concurrency import describe_error, run_concurrently
+from utils.config import get_env_float, get_env_int
+from utils.etag import content_etag
 from utils.guard import myguard
 from utils.logger import get_the_logger
+from utils.ownership import is_created_by
+from utils.pagination import Page, paginate
 
 logger = get_the_logger()
 
+# seconds to wait for all data sources of a share instance
+FETCH_DEADLINE = get_env_float('SHARE_INSTANCE_FETCH_DEADLINE', 10.0)
+# seconds to keep a rendered share instance, at most the refresh interval of its data sources
+SHARE_INSTANCE_CACHE_TTL = get_env_int('SHARE_INSTANCE_CACHE_TTL', 60)
+# serialized share instance response and its ETag
+RenderedShareInstance = namedtuple('RenderedShareInstance', ['body', 'etag'])
+
+# query params starting with it control the request, such as the share config password `_pw`,
+# they are never rendered nor bound to slots, whose param names cannot start with it
+CONTROL_PARAM_PREFIX = '_'
+
 
 class ShareConfigService:
     def __init__(self) -> None:
@@ -18,20 +38,21 @@ class ShareConfigService:
         self.project_dao = ProjectDao()
         self.user_dao = UserDao()
 
-    def get_share_configs(self, jwt_id) -> List[ShareConfig]:
+    def get_share_configs(self,
+                          jwt_id,
+                          limit: Optional[str] = None,
+                          cursor: Optional[str] = None) -> Page:
         # TODO: accept query
 
-        # get auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
         # validate args and construct query dict
-        query = {'created_by': user}
+        myguard.check_literaly.user_id(jwt_id)
+        query = {'created_by': jwt_id}
 
         # query projects with query dict
         share_configs = ShareConfig.objects(**query)
 
         logger.info("Query processed. Detail: {}".format(query))
-        return share_configs
+        return paginate(share_configs, limit, cursor)
 
     def get_by_id(self, id: str, password: str) -> ShareConfig:
         # query project via id
@@ -45,6 +66,19 @@ class ShareConfigService:
         # share_config.desensitize()
         return share_config
 
+    def get_raw_by_id(self, id: str, password: str) -> dict:
+        """
+        Same as `get_by_id`, with the share config as a raw document for read-only responses.
+        """
+        share_config = self.share_config_dao.get_raw_by_id(id)
+
+        # check if password-protected
+        if share_config.get('password_protected'):
+            self.share_config_dao.assert_password_value_match(
+                share_config.get('password'), password)
+
+        return share_config
+
     def create_share_config(self,
                             jwt_id: str,
                             name: str,
@@ -55,9 +89,7 @@ class ShareConfigService:
         project = self.project_dao.get_by_id(project_id)
 
         # get auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if project.created_by != user:
+        if not is_created_by(project, jwt_id):
             raise ForbiddenError(
                 "Cannot share a project not created by current user.")
 
@@ -93,7 +125,7 @@ class ShareConfigService:
         share_config.modified = curr_time
 
         # set created by
-        share_config.created_by = user
+        share_config.created_by = self.user_dao.get_user_by_id(jwt_id)
 
         # save share config
         self.share_config_dao.save(share_config)
@@ -109,9 +141,7 @@ class ShareConfigService:
         share_config = self.share_config_dao.get_by_id(id)
 
         # get auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if share_config.created_by != user:
+        if not is_created_by(share_config, jwt_id):
             raise ForbiddenError(
                 "Cannot edit a share config not created by current user.")
 
@@ -134,9 +164,7 @@ class ShareConfigService:
         share_config = self.share_config_dao.get_by_id(id)
 
         # get auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if share_config.created_by != user:
+        if not is_created_by(share_config, jwt_id):
             raise ForbiddenError()
 
         # check if password-protected
@@ -157,9 +185,7 @@ class ShareConfigService:
         share_config = self.share_config_dao.get_by_id(id)
 
         # get auth
-        user = self.user_dao.get_user_by_id(jwt_id)
-
-        if share_config.created_by != user:
+        if not is_created_by(share_config, jwt_id):
             raise ForbiddenError()
 
         modifing_dict = {}
@@ -203,37 +229,119 @@ class ShareInstanceService():
         self.user_dao = UserDao()
         self.data_source_dao = DataSourceDao()
         self.display_schema_dao = DisplaySchemaDao()
+        self.share_instance_view_dao = ShareInstanceViewDao()
 
     def get_by_id(self,
                   id: str,
                   password: str,
                   query: dict,
-                  jwt_id: str):
-        # get share_config by id
-        share_config = self.share_config_dao.get_by_id(id)
+                  jwt_id: str) -> RenderedShareInstance:
+        # leave control params out of the data, the template context and the cache key
+        query = {key: value for key, value in query.items()
+                 if not key.startswith(CONTROL_PARAM_PREFIX)}
+
+        # serve a rendered share instance without touching database or upstreams
+        cache_key = (id, tuple(sorted(query.items())))
+        entry = share_instance_cache.get_entry(cache_key)
+        if entry is not None:
+            share_config_password, rendered = entry.value
+            if share_config_password is not None:
+                self.share_config_dao.assert_password_value_match(
+                    share_config_password, password)
+            return rendered
+
+        # get share config, project, data sources and display schema in one read
+        view = self.share_instance_view_dao.get_by_id(id)
+        if view is None:
+            # view is not built yet
+            share_config = self.share_config_dao.get_by_id(id)
+            view = self.share_instance_view_dao.build(share_config)
+            if view is None:
+                raise NotFoundError('project', 'share config id={}'.format(id))
 
         # check auth
-        if share_config.password is not None:
-            self.share_config_dao.assert_password_match(share_config, password)
-
-        # get project
-        project = share_config.linked_project
+        if view.password is not None:
+            self.share_config_dao.assert_password_value_match(
+                view.password, password)
 
-        # get first data_source
-        # TODO: change to support multiple data sources
-        data_sources = project.data_sources
+        # get all data_sources
+        data_sources = [DataSource._from_son(son) for son in view.data_sources]
         if len(data_sources) <= 0:
             raise InvalidParamError(
-                'Project {} has no data sources.'.format(project.id))
-        data_source = data_sources[0]
-
-        # get latest data
-        self.data_source_dao.refresh_data(data_source, query)
+                'Project {} has no data sources.'.format(view.project))
 
         # get display_schema
-        display_schema = project.display_schema
+        if view.display_schema is None:
+            raise InvalidParamError(
+                'Project {} has no display schema.'.format(view.project))
+        display_schema = DisplaySchema._from_son(view.display_schema)
+        template = self.display_schema_dao.get_option_template(display_schema)
 
-        # TODO: assemble all above int ECharts option format
+        # get latest data
+        data, errors = self.refresh_data_sources(data_sources, query)
+
+        # assemble data into ECharts option
+        option, missing = template.render({'data': data, 'query': query})
+
+        body = json.dumps({'option': option, 'errors': errors, 'missing': missing})
+        rendered = RenderedShareInstance(body, content_etag(body))
+
+        # cache complete responses no longer than the data in them stays fresh
+        if not errors:
+            ttl = min([SHARE_INSTANCE_CACHE_TTL] + [
+                self.data_source_dao.get_refresh_policy(data_source).interval
+                for data_source in data_sources])
+            dependencies = [get_dependency(ShareConfig, view.pk),
+                            get_dependency(Project, view.project),
+                            get_dependency(DisplaySchema, view.display_schema_id)]
+            dependencies += [get_dependency(DataSource, data_source_id)
+                             for data_source_id in view.data_source_ids]
+            share_instance_cache.set_with_dependencies(
+                cache_key, (view.password, rendered), len(body), ttl, dependencies)
+
+        return rendered
+
+    def rebuild_views(self) -> int:
+        """
+        Regenerate all share instance views, and drop responses rendered from the old ones.
+
+        Returns:
+            int: number of views built
+        """
+        count = self.share_instance_view_dao.rebuild_all()
+        share_instance_cache.clear()
+        return count
+
+    def refresh_data_sources(self, data_sources: List[DataSource], query: dict):
+        """
+        Fetch latest data of all data sources concurrently.
+
+        Args:
+            data_sources (List[DataSource]): data sources of a project
+            query (dict): request query
+
+        Returns:
+            Tuple[dict, dict]: data and errors, both keyed by data source id
+        """
+        def get_refresh_task(data_source: DataSource):
+            return lambda: self.data_source_dao.refresh_data(data_source, query)
+
+        def get_timeout_error(idx: int):
+            return UpstreamTimeoutError('Data source {} did not respond in {} seconds.'.format(
+                data_sources[idx].pk, FETCH_DEADLINE))
+
+        outcomes = run_concurrently(
+            [get_refresh_task(data_source) for data_source in data_sources],
+            timeout=FETCH_DEADLINE,
+            timeout_error=get_timeout_error)
+
+        data = {}
+        errors = {}
+        for data_source, (_, error) in zip(data_sources, outcomes):
+            data_source_id = str(data_source.pk)
+            if error is None:
+                data[data_source_id] = data_source.data
+            else:
+                errors[data_source_id] = describe_error(error)
 
-        # TODO: return option response
-        return {}
+        return data, errors
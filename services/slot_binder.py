@@ -0,0 +1,181 @@
+import datetime
+from typing import Callable, List
+
+import utils
+from errors import InvalidParamError
+from utils.logger import get_the_logger
+
+logger = get_the_logger()
+
+TRUE_LITERALS = {'true', '1', 'yes', 'on'}
+FALSE_LITERALS = {'false', '0', 'no', 'off'}
+
+
+def _to_string(value) -> str:
+    return value if isinstance(value, str) else str(value)
+
+
+def _to_int(value) -> str:
+    if isinstance(value, bool):
+        raise ValueError()
+    if isinstance(value, str):
+        # validated, but sent as written, such as '007'
+        int(value)
+        return value
+    if isinstance(value, float) and not value.is_integer():
+        raise ValueError()
+    return str(int(value))
+
+
+def _to_float(value) -> str:
+    if isinstance(value, bool):
+        raise ValueError()
+    if isinstance(value, str):
+        # validated, but sent as written, such as '2.50'
+        float(value)
+        return value
+    text = repr(float(value))
+    return text[:-2] if text.endswith('.0') else text
+
+
+def _to_bool(value) -> str:
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+
+    text = _to_string(value).strip().lower()
+    if text in TRUE_LITERALS:
+        return 'true'
+    if text in FALSE_LITERALS:
+        return 'false'
+    raise ValueError()
+
+
+def _to_date(value) -> str:
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    return datetime.date.fromisoformat(_to_string(value).strip()).isoformat()
+
+
+# slot_type -> (converter to the upstream param string, readable type name)
+CONVERTERS = {
+    'string': (_to_string, 'string'),
+    'str': (_to_string, 'string'),
+    'int': (_to_int, 'integer'),
+    'integer': (_to_int, 'integer'),
+    'float': (_to_float, 'number'),
+    'number': (_to_float, 'number'),
+    'bool': (_to_bool, 'boolean'),
+    'boolean': (_to_bool, 'boolean'),
+    'date': (_to_date, 'date (YYYY-MM-DD)'),
+}
+
+
+def get_converter(slot_type) -> tuple:
+    """
+    Converter of a slot type and its readable type name, unknown types are strings.
+    """
+    if not isinstance(slot_type, str):
+        return CONVERTERS['string']
+    return CONVERTERS.get(slot_type.lower(), CONVERTERS['string'])
+
+
+class SlotBinding:
+    def __init__(self,
+                 name: str,
+                 param_name: str,
+                 optional: bool,
+                 default: str,
+                 convert: Callable,
+                 type_name: str) -> None:
+        self.name = name
+        self.param_name = param_name
+        self.optional = optional
+        self.default = default
+        self.convert = convert
+        self.type_name = type_name
+
+    def coerce(self, value) -> str:
+        try:
+            return self.convert(value)
+        except (TypeError, ValueError):
+            raise InvalidParamError('{} should be of type {}.'.format(
+                self.param_name, self.type_name))
+
+
+class SlotBinder:
+    """
+    Slots of a data source compiled into a binding plan.
+
+    Slots are validated, converters are picked and defaults are coerced once, so
+    binding a request query only looks up and converts the provided values.
+    Unknown slot types are bound as strings, and empty values are sent as is.
+    """
+
+    def __init__(self, slots: List[dict]) -> None:
+        self.bindings = []
+
+        names = set()
+        param_names = set()
+        for slot in slots:
+            name, type, optional, default, alias = [
+                slot.get(x) for x in ['name', 'slot_type', 'optional', 'default', 'alias']]
+
+            utils.myguard.check_literaly.check_type([
+                (str, name, 'name', False),
+                (str, type, 'slot_type', False),
+                (bool, optional, 'optional', True),
+                (str, default, 'default', True),
+                (str, alias, 'alias', True),
+            ])
+
+            param_name = alias if alias else name
+            if name in names or param_name in param_names:
+                raise InvalidParamError(
+                    'Slot "{}" contains duplicate param names or aliases.'.format(name))
+            names.add(name)
+            param_names.add(param_name)
+
+            convert, type_name = get_converter(type)
+            binding = SlotBinding(name, param_name, bool(optional), None,
+                                  convert, type_name)
+            if default:
+                try:
+                    binding.default = binding.coerce(default)
+                except InvalidParamError:
+                    # stored before defaults were validated, keep sending it as is
+                    logger.warning('Default of slot "{}" should be of type {}.'.format(
+                        name, type_name))
+                    binding.default = default
+
+            self.bindings.append(binding)
+
+    def bind(self, query: dict) -> dict:
+        """
+        Bind a request query to the slots.
+
+        Args:
+            query (dict): request query
+
+        Raises:
+            InvalidParamError: raises if a required slot is missing or a value cannot be coerced
+
+        Returns:
+            dict: params to send to the upstream url
+        """
+        request_params = {}
+
+        for binding in self.bindings:
+            value = query.get(binding.param_name)
+
+            if value == '':
+                request_params[binding.name] = value
+            elif value is not None:
+                request_params[binding.name] = binding.coerce(value)
+            elif not binding.optional:
+                # field is required
+                raise InvalidParamError(
+                    'Please provide {} in query.'.format(binding.name))
+            elif binding.default is not None:
+                request_params[binding.name] = binding.default
+
+        return request_params
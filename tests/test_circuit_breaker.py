@@ -0,0 +1,58 @@
+import time
+import unittest
+
+from utils.circuit_breaker import (CLOSED, HALF_OPEN, OPEN, CircuitBreaker,
+                                   CircuitRejectedError)
+
+RECOVERY_TIMEOUT = 0.05
+
+
+class CircuitBreakerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.breaker = CircuitBreaker('test-host', failure_threshold=1,
+                                      recovery_timeout=RECOVERY_TIMEOUT, max_in_flight=8)
+
+    def open_to_half_open(self) -> bool:
+        """
+        Open the circuit with one failure while another call is in flight,
+        then wait until it is half open.
+
+        Returns:
+            bool: probe flag of the call let in before the circuit opened
+        """
+        late = self.breaker.acquire()
+        failing = self.breaker.acquire()
+        self.breaker.release(success=False, probe=failing)
+        self.assertEqual(self.breaker.stats()['state'], OPEN)
+
+        time.sleep(RECOVERY_TIMEOUT * 2)
+        self.assertEqual(self.breaker.stats()['state'], HALF_OPEN)
+        return late
+
+    def test_late_release_does_not_close_half_open_circuit(self) -> None:
+        late = self.open_to_half_open()
+        probe = self.breaker.acquire()
+        self.assertTrue(probe)
+
+        self.breaker.release(success=True, probe=late)
+        self.assertEqual(self.breaker.stats()['state'], HALF_OPEN)
+        with self.assertRaises(CircuitRejectedError):
+            self.breaker.acquire()
+
+        self.breaker.release(success=False, probe=probe)
+        self.assertEqual(self.breaker.stats()['state'], OPEN)
+
+    def test_late_failure_does_not_reopen_half_open_circuit(self) -> None:
+        late = self.open_to_half_open()
+        probe = self.breaker.acquire()
+
+        self.breaker.release(success=False, probe=late)
+        self.assertEqual(self.breaker.stats()['state'], HALF_OPEN)
+
+        self.breaker.release(success=True, probe=probe)
+        self.assertEqual(self.breaker.stats()['state'], CLOSED)
+        self.assertEqual(self.breaker.stats()['in_flight'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,45 @@
+import time
+import unittest
+
+from utils.refresh_scheduler import RefreshJob, RefreshScheduler
+
+INTERVAL = 0.05
+
+
+class RefreshSchedulerTest(unittest.TestCase):
+    def setUp(self) -> None:
+        self.scheduler = RefreshScheduler('test-refresher')
+        self.refreshes = 0
+
+    def refresh(self) -> float:
+        self.refreshes += 1
+        return INTERVAL
+
+    def schedule(self, key: str) -> None:
+        # as a cache miss does: read the key, then refresh it before it expires
+        self.scheduler.touch(key)
+        self.scheduler.schedule(
+            RefreshJob(key, self.refresh, retry_delay=INTERVAL, idle_timeout=60),
+            INTERVAL)
+
+    def test_single_read_refreshes_at_most_once(self) -> None:
+        self.schedule('cold')
+
+        time.sleep(INTERVAL * 10)
+
+        self.assertLessEqual(self.refreshes, 1)
+        self.assertEqual(self.scheduler.stats()['queue_depth'], 0)
+
+    def test_read_keys_keep_refreshing(self) -> None:
+        self.schedule('hot')
+
+        deadline = time.monotonic() + INTERVAL * 10
+        while time.monotonic() < deadline:
+            self.scheduler.touch('hot')
+            time.sleep(INTERVAL / 5)
+
+        self.assertGreater(self.refreshes, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
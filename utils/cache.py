@@ -0,0 +1,202 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Hashable, Iterable, Optional
+
+
+class CacheEntry:
+    def __init__(self, value, size: int, expires_at: float, stale_until: float) -> None:
+        self.value = value
+        self.size = size
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+
+    def is_expired(self, now: float) -> bool:
+        return now >= self.expires_at
+
+    def is_dead(self, now: float) -> bool:
+        return now >= self.stale_until
+
+
+class TTLCache:
+    """
+    A thread-safe in-process cache with a time-to-live per entry.
+
+    Entries are evicted in least-recently-used order whenever the cache holds
+    more than `max_entries` entries or more than `max_bytes` bytes in total.
+    The size of an entry is provided by the caller when it is set.
+
+    An entry may outlive its ttl by `stale_ttl` seconds, during which it is still
+    returned so that the caller can serve it while revalidating. Dead entries stay
+    until evicted, as a last resort for callers which cannot get a fresh value.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+
+        self._entries = OrderedDict()
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def _evict(self) -> None:
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self._total_bytes > self.max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def get_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get a fresh or stale entry. Entries past their stale time count as a miss,
+        but are kept until evicted so `peek_entry` can still return them.
+        Use `CacheEntry.is_expired` to tell stale entries.
+
+        Args:
+            key (Hashable): cache key
+
+        Returns:
+            CacheEntry: the entry, or None if missing or dead
+        """
+        with self._lock:
+            now = time.monotonic()
+            entry = self._entries.get(key)
+
+            if entry is not None and entry.is_dead(now):
+                self.expirations += 1
+                entry = None
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            if entry.is_expired(now):
+                self.stale_hits += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def peek_entry(self, key: Hashable) -> Optional[CacheEntry]:
+        """
+        Get the last entry set for a key, even a dead one, without touching stats or recency.
+        """
+        with self._lock:
+            return self._entries.get(key)
+
+    def set(self, key: Hashable, value, size: int, ttl: float, stale_ttl: float = 0) -> None:
+        # entries that can never fit are not cached at all
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            expires_at = time.monotonic() + ttl
+            self._entries[key] = CacheEntry(
+                value, size, expires_at, expires_at + stale_ttl)
+            self._total_bytes += size
+            self._evict()
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._total_bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'stale_hits': self.stale_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+            }
+
+
+class DependencyCache(TTLCache):
+    """
+    A TTLCache whose entries record the keys of the documents they were built from.
+
+    `invalidate_dependency` drops every entry depending on a changed document, so
+    entries can live long without serving outdated documents.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int) -> None:
+        super().__init__(max_entries, max_bytes)
+
+        # dependency -> keys of entries, and key -> dependencies of its entry
+        self._dependents = {}
+        self._dependencies = {}
+
+        self.invalidations = 0
+
+    def _remove(self, key: Hashable) -> None:
+        super()._remove(key)
+        for dependency in self._dependencies.pop(key, ()):
+            keys = self._dependents.get(dependency)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._dependents[dependency]
+
+    def set_with_dependencies(self, key: Hashable, value, size: int, ttl: float,
+                              dependencies: Iterable[Hashable]) -> None:
+        # entries that can never fit are not cached at all
+        if ttl <= 0 or size > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            expires_at = time.monotonic() + ttl
+            self._entries[key] = CacheEntry(value, size, expires_at, expires_at)
+            self._total_bytes += size
+
+            dependencies = frozenset(dependencies)
+            self._dependencies[key] = dependencies
+            for dependency in dependencies:
+                self._dependents.setdefault(dependency, set()).add(key)
+
+            self._evict()
+
+    def invalidate_dependency(self, dependency: Hashable) -> None:
+        with self._lock:
+            for key in list(self._dependents.get(dependency, ())):
+                self._remove(key)
+                self.invalidations += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self._dependents.clear()
+            self._dependencies.clear()
+
+    def stats(self) -> dict:
+        stats = super().stats()
+        with self._lock:
+            stats['dependencies'] = len(self._dependents)
+            stats['invalidations'] = self.invalidations
+        return stats
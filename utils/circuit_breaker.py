@@ -0,0 +1,160 @@
+import threading
+import time
+
+'''
+Import example: from utils.circuit_breaker import CircuitBreakerRegistry
+
+breaker = registry.get(host)
+probe = breaker.acquire()
+try:
+    ...
+except SomeFailure:
+    breaker.release(success=False, probe=probe)
+    raise
+else:
+    breaker.release(success=True, probe=probe)
+'''
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+class CircuitRejectedError(Exception):
+    def __init__(self, name: str, reason: str) -> None:
+        super().__init__('{} rejected: {}.'.format(name, reason))
+        self.name = name
+        self.reason = reason
+
+
+class CircuitBreaker:
+    """
+    A circuit breaker combined with a limit of calls in flight.
+
+    * closed: calls pass until `failure_threshold` consecutive calls fail
+    * open: calls are rejected until `recovery_timeout` seconds passed
+    * half open: one probe call passes, its outcome closes or re-opens the circuit,
+      calls let in before the circuit opened do not change it when they finish
+
+    At most `max_in_flight` calls pass at the same time in any state.
+    """
+
+    def __init__(self,
+                 name: str,
+                 failure_threshold: int,
+                 recovery_timeout: float,
+                 max_in_flight: int) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_in_flight = max_in_flight
+
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._in_flight = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+        self.rejected = 0
+
+    def _current_state(self, now: float) -> str:
+        if self._state == OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def acquire(self) -> bool:
+        """
+        Raises:
+            CircuitRejectedError: raises if the circuit is open or too many calls are in flight
+
+        Returns:
+            bool: True if the call is the probe of a half open circuit, pass it to `release`
+        """
+        with self._lock:
+            state = self._current_state(time.monotonic())
+
+            reason = None
+            if state == OPEN:
+                reason = 'circuit is open'
+            elif state == HALF_OPEN and self._probing:
+                reason = 'circuit is half open and probing'
+            elif self._in_flight >= self.max_in_flight:
+                reason = 'too many requests in flight'
+
+            if reason is not None:
+                self.rejected += 1
+                raise CircuitRejectedError(self.name, reason)
+
+            probe = state == HALF_OPEN
+            if probe:
+                self._probing = True
+            self._in_flight += 1
+            return probe
+
+    def release(self, success: bool, probe: bool = False) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+            if probe:
+                self._probing = False
+            elif self._state != CLOSED:
+                # a call let in before the circuit opened, only the probe decides now
+                return
+
+            if success:
+                self._failures = 0
+                self._state = CLOSED
+                return
+
+            self._failures += 1
+            if probe or self._failures >= self.failure_threshold:
+                self._state = OPEN
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'in_flight': self._in_flight,
+                'max_in_flight': self.max_in_flight,
+                'rejected': self.rejected,
+                'retry_in': round(max(0.0, self._opened_at + self.recovery_timeout - now), 3)
+                if state == OPEN else 0.0,
+            }
+
+
+class CircuitBreakerRegistry:
+    """
+    Lazily create one circuit breaker per name with the same settings.
+    """
+
+    def __init__(self,
+                 failure_threshold: int,
+                 recovery_timeout: float,
+                 max_in_flight: int) -> None:
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.max_in_flight = max_in_flight
+
+        self._breakers = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(name)
+            if breaker is None:
+                breaker = CircuitBreaker(name,
+                                         failure_threshold=self.failure_threshold,
+                                         recovery_timeout=self.recovery_timeout,
+                                         max_in_flight=self.max_in_flight)
+                self._breakers[name] = breaker
+            return breaker
+
+    def stats(self) -> dict:
+        with self._lock:
+            breakers = list(self._breakers.values())
+        return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,92 @@
+import gzip
+from typing import Hashable, List
+
+from utils.cache import TTLCache
+from utils.config import get_env_int
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+'''
+Import example: from utils.compression import compress, get_available_encodings
+
+`br` and `zstd` are offered only if `brotli` and `zstandard` are installed.
+'''
+
+GZIP_LEVEL = get_env_int('RESPONSE_GZIP_LEVEL', 6)
+BROTLI_QUALITY = get_env_int('RESPONSE_BROTLI_QUALITY', 5)
+ZSTD_LEVEL = get_env_int('RESPONSE_ZSTD_LEVEL', 3)
+# smaller bodies gain less than the cost of compressing them
+MIN_COMPRESS_BYTES = get_env_int('RESPONSE_COMPRESSION_MIN_BYTES', 1024)
+
+# (version key of a body, content coding) -> compressed body
+compressed_bodies = TTLCache(
+    max_entries=get_env_int('COMPRESSED_BODY_CACHE_MAX_ENTRIES', 1024),
+    max_bytes=get_env_int('COMPRESSED_BODY_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+
+
+def _compress_gzip(body: bytes) -> bytes:
+    # fixed mtime, so the same body always compresses to the same bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _compress_brotli(body: bytes) -> bytes:
+    return brotli.compress(body, mode=brotli.MODE_TEXT, quality=BROTLI_QUALITY)
+
+
+def _compress_zstd(body: bytes) -> bytes:
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+# content coding -> compressor, in order of server preference
+COMPRESSORS = {}
+if brotli is not None:
+    COMPRESSORS['br'] = _compress_brotli
+if zstandard is not None:
+    COMPRESSORS['zstd'] = _compress_zstd
+COMPRESSORS['gzip'] = _compress_gzip
+
+
+def get_available_encodings() -> List[str]:
+    return list(COMPRESSORS.keys())
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    """
+    Args:
+        body (bytes): response body
+        encoding (str): one of `get_available_encodings()`
+
+    Returns:
+        bytes: body compressed with the content coding
+    """
+    return COMPRESSORS[encoding](body)
+
+
+def compress_cached(body: bytes, encoding: str, key: Hashable) -> bytes:
+    """
+    Compress a body once per version of it.
+
+    Args:
+        body (bytes): response body
+        encoding (str): one of `get_available_encodings()`
+        key (Hashable): identifies the body, such as its strong ETag
+
+    Returns:
+        bytes: body compressed with the content coding
+    """
+    entry = compressed_bodies.get_entry((key, encoding))
+    if entry is not None:
+        return entry.value
+
+    compressed = compress(body, encoding)
+    compressed_bodies.set((key, encoding), compressed,
+                          len(compressed), float('inf'))
+    return compressed
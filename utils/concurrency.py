@@ -0,0 +1,89 @@
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, List, Optional, Tuple
+
+from errors import ServerError
+from utils.config import get_env_int
+from utils.logger import get_the_logger
+
+'''
+Import example: from utils.concurrency import run_concurrently
+'''
+
+logger = get_the_logger()
+
+# shared by all requests so the number of upstream fetch threads stays bounded
+fetch_executor = ThreadPoolExecutor(
+    max_workers=get_env_int('UPSTREAM_FETCH_WORKERS', 16),
+    thread_name_prefix='upstream-fetch')
+
+
+def run_concurrently(tasks: List[Callable], timeout: float,
+                     timeout_error: Callable[[int], Exception],
+                     max_concurrency: Optional[int] = None) -> List[Tuple[object, Exception]]:
+    """
+    Run tasks on the shared fetch executor and wait for them until a deadline.
+
+    Args:
+        tasks (List[Callable]): functions without arguments
+        timeout (float): seconds to wait for all tasks
+        timeout_error (Callable[[int], Exception]): builds the error of an unfinished task from its index
+        max_concurrency (int): most tasks submitted at the same time, unbounded if None
+
+    Returns:
+        List[Tuple[object, Exception]]: (result, error) of every task, in input order
+    """
+    if max_concurrency is None or max_concurrency >= len(tasks):
+        futures = [fetch_executor.submit(task) for task in tasks]
+        wait(futures, timeout=timeout)
+    else:
+        # keep a window of running tasks, submit the next one whenever one finishes
+        deadline = time.monotonic() + timeout
+        futures = [None] * len(tasks)
+        running = set()
+        next_idx = 0
+        while next_idx < len(tasks) or running:
+            while next_idx < len(tasks) and len(running) < max_concurrency:
+                futures[next_idx] = fetch_executor.submit(tasks[next_idx])
+                running.add(futures[next_idx])
+                next_idx += 1
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _, running = wait(running, timeout=remaining,
+                              return_when=FIRST_COMPLETED)
+
+    outcomes = []
+    for idx, future in enumerate(futures):
+        if future is None:
+            # never submitted before the deadline
+            outcomes.append((None, timeout_error(idx)))
+        elif not future.done():
+            # give up waiting, and drop the task if it has not started yet
+            future.cancel()
+            outcomes.append((None, timeout_error(idx)))
+        elif future.exception() is not None:
+            outcomes.append((None, future.exception()))
+        else:
+            outcomes.append((future.result(), None))
+
+    return outcomes
+
+
+def describe_error(error: Exception) -> dict:
+    """
+    Describe the error of a task in the same form as an error response.
+
+    Args:
+        error (Exception): error raised by a task
+
+    Returns:
+        dict: title, status and detail of the error, without detail if unexpected
+    """
+    if isinstance(error, ServerError):
+        return {'title': error.title, 'status': error.status, 'detail': error.detail}
+
+    logger.error('Type:{}, Detail:{}'.format(
+        error.__class__.__name__, str(error)))
+    return {'title': 'Internal Server Error', 'status': 500, 'detail': ''}
@@ -0,0 +1,59 @@
+import os
+from typing import List
+
+'''
+Typed accessors for optional tuning knobs read from environment variables.
+Unset or empty variables fall back to the given default.
+'''
+
+
+def _get_raw(name: str):
+    value = os.getenv(name)
+    if value is None or value.strip() == '':
+        return None
+    return value.strip()
+
+
+def get_env_int(name: str, default: int) -> int:
+    value = _get_raw(name)
+    if value is None:
+        return default
+
+    try:
+        return int(value)
+    except ValueError:
+        raise RuntimeError(
+            'Environment variable {} must be an integer, got "{}".'.format(name, value))
+
+
+def get_env_float(name: str, default: float) -> float:
+    value = _get_raw(name)
+    if value is None:
+        return default
+
+    try:
+        return float(value)
+    except ValueError:
+        raise RuntimeError(
+            'Environment variable {} must be a number, got "{}".'.format(name, value))
+
+
+def get_env_list(name: str, default: List[str]) -> List[str]:
+    value = _get_raw(name)
+    if value is None:
+        return default
+
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def get_env_bool(name: str, default: bool) -> bool:
+    value = _get_raw(name)
+    if value is None:
+        return default
+
+    if value.lower() in ('true', '1', 'yes'):
+        return True
+    if value.lower() in ('false', '0', 'no'):
+        return False
+    raise RuntimeError(
+        'Environment variable {} must be a boolean, got "{}".'.format(name, value))
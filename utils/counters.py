@@ -0,0 +1,40 @@
+import threading
+from collections import Counter
+from typing import Hashable
+
+'''
+Import example: from utils.counters import KeyedCounters
+
+revalidations = KeyedCounters()
+revalidations.incr(data_source_id, 'not_modified')
+'''
+
+
+class KeyedCounters:
+    """
+    Thread-safe named counters grouped by key.
+    """
+
+    def __init__(self) -> None:
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def incr(self, key: Hashable, name: str, amount: int = 1) -> None:
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None:
+                counter = Counter()
+                self._counters[key] = counter
+            counter[name] += amount
+
+    def get(self, key: Hashable) -> dict:
+        with self._lock:
+            return dict(self._counters.get(key, {}))
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._counters.pop(key, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {key: dict(counter) for key, counter in self._counters.items()}
@@ -0,0 +1,38 @@
+import datetime
+import hashlib
+from typing import Optional
+
+from utils.time import get_millis
+
+'''
+Import example: from utils.etag import document_etag
+
+Values are unquoted, as expected by werkzeug `Response.set_etag` and `request.if_none_match`.
+'''
+
+
+def document_etag(id, modified: datetime.datetime) -> str:
+    """
+    ETag of a stored document, changes whenever its `modified` does.
+    MongoDB keeps milliseconds, so finer precision is dropped.
+    """
+    return '{}-{}'.format(id, get_millis(modified))
+
+
+def readable_document_etag(version: dict, jwt_id: str) -> Optional[str]:
+    """
+    ETag of a document version from `BaseDao.get_version`, if the jwt user can read it.
+
+    Returns:
+        str: ETag, or None if readability needs the full authorization check
+    """
+    if not version.get('public') and str(version.get('created_by')) != str(jwt_id):
+        return None
+    return document_etag(version['_id'], version['modified'])
+
+
+def content_etag(body: str) -> str:
+    """
+    ETag of a computed payload, derived from its serialized content.
+    """
+    return hashlib.sha1(body.encode('utf-8')).hexdigest()
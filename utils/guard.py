@@ -113,7 +113,8 @@ class CheckingCenter():
 
         A parameter can pass a check only if
         * the parameter is null when 'nullable' in args
-        * or parameter is an instance of the designated type.
+        * or parameter is an instance of the designated type,
+          booleans are not integers here though `bool` is a subclass of `int`.
 
         Args:
             check_list (List[Check_Tuple]):
@@ -128,7 +129,7 @@ class CheckingCenter():
                 if not nullable:
                     raise InvalidParamError('{} cannot be null.'.format(name))
 
-            elif not isinstance(para, type):
+            elif not isinstance(para, type) or (type is int and isinstance(para, bool)):
                 raise InvalidParamError(
                     '{} should be a {}.'.format(name, type.__name__))
 
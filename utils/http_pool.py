@@ -0,0 +1,192 @@
+import socket
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.config import get_env_float, get_env_int
+
+'''
+Import example: from utils.http_pool import http_session_pool
+
+with http_session_pool.session(url) as session:
+    response = session.get(url, params=params)
+'''
+
+
+class PoolTimeoutError(Exception):
+    def __init__(self, host: str, timeout: float) -> None:
+        super().__init__('No free connection to {} within {} seconds.'.format(host, timeout))
+        self.host = host
+        self.timeout = timeout
+
+
+def _shutdown(sock: socket.socket) -> None:
+    try:
+        sock.shutdown(socket.SHUT_RDWR)
+    except OSError:
+        # already closed
+        pass
+
+
+def _get_socket(response: requests.Response):
+    # socket read by http.client, kept by the response even after its connection gave it up
+    fp = getattr(getattr(response.raw, '_fp', None), 'fp', None)
+    return getattr(getattr(fp, 'raw', None), '_sock', None)
+
+
+@contextmanager
+def read_deadline(response: requests.Response, deadline: float):
+    """
+    Shut the connection of a streamed response down at the monotonic `deadline`,
+    so a body trickling in under the read timeout cannot hold the reading thread past it.
+    """
+    sock = _get_socket(response)
+    timer = None
+    if sock is not None:
+        timer = threading.Timer(max(0.0, deadline - time.monotonic()), _shutdown, (sock,))
+        timer.daemon = True
+        timer.start()
+
+    try:
+        yield
+    finally:
+        if timer is not None:
+            timer.cancel()
+
+
+def get_host(url: str) -> str:
+    parts = urlsplit(url)
+    return '{}://{}'.format(parts.scheme.lower(), parts.netloc.lower())
+
+
+class _HostSession:
+    def __init__(self, session: requests.Session, now: float, max_connections: int) -> None:
+        self.session = session
+        self.last_used = now
+        self.in_use = 0
+        # one slot per pooled connection, so borrowers never block inside urllib3
+        self.connections = threading.BoundedSemaphore(max_connections)
+
+
+class HttpSessionPool:
+    """
+    A per-process pool of keep-alive `requests.Session`, one per upstream host.
+
+    Sessions are reused across requests so DNS, TCP and TLS setup is paid once per
+    host instead of once per fetch. Sessions idle longer than `idle_timeout` seconds
+    are closed, and at most `pool_size` hosts are kept open at the same time.
+    A borrower waits at most `pool_timeout` seconds for a free connection of its host.
+    """
+
+    def __init__(self,
+                 pool_size: int,
+                 max_connections_per_host: int,
+                 idle_timeout: float,
+                 pool_timeout: float) -> None:
+        if pool_size <= 0 or max_connections_per_host <= 0:
+            raise RuntimeError(
+                'Size of http session pool and connections per host must be positive.')
+
+        self.pool_size = pool_size
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+
+        # host -> _HostSession, ordered from least to most recently used
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _create_session(self) -> requests.Session:
+        # `pool_block` never opens connections beyond the per-host cap, waits for
+        # a free connection are bounded by the connection slots of `session`
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.max_connections_per_host,
+                              pool_block=True)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    def _evict(self, now: float) -> None:
+        # close sessions which are idle for too long
+        for host in list(self._sessions.keys()):
+            entry = self._sessions[host]
+            if entry.in_use == 0 and now - entry.last_used > self.idle_timeout:
+                del self._sessions[host]
+                entry.session.close()
+
+        # close least recently used idle sessions if too many hosts are open
+        for host in list(self._sessions.keys()):
+            if len(self._sessions) <= self.pool_size:
+                break
+            entry = self._sessions[host]
+            if entry.in_use == 0:
+                del self._sessions[host]
+                entry.session.close()
+
+    @contextmanager
+    def session(self, url: str):
+        """
+        Borrow the keep-alive session of the host of `url`.
+
+        Args:
+            url (str): upstream url
+
+        Raises:
+            PoolTimeoutError: raises if no connection of the host is free within `pool_timeout`
+
+        Yields:
+            requests.Session: session shared by all fetches to the same host
+        """
+        host = get_host(url)
+
+        with self._lock:
+            now = time.monotonic()
+            entry = self._sessions.get(host)
+            if entry is None:
+                entry = _HostSession(self._create_session(), now,
+                                     self.max_connections_per_host)
+                self._sessions[host] = entry
+            else:
+                self._sessions.move_to_end(host)
+
+            entry.in_use += 1
+            entry.last_used = now
+            self._evict(now)
+
+        try:
+            if not entry.connections.acquire(timeout=self.pool_timeout):
+                raise PoolTimeoutError(host, self.pool_timeout)
+            try:
+                yield entry.session
+            finally:
+                entry.connections.release()
+        finally:
+            with self._lock:
+                entry.in_use -= 1
+                entry.last_used = time.monotonic()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {host: {'in_use': entry.in_use,
+                           'idle_seconds': round(time.monotonic() - entry.last_used, 3)}
+                    for host, entry in self._sessions.items()}
+
+    def close(self) -> None:
+        with self._lock:
+            for entry in self._sessions.values():
+                entry.session.close()
+            self._sessions.clear()
+
+
+http_session_pool = HttpSessionPool(
+    pool_size=get_env_int('UPSTREAM_POOL_SIZE', 32),
+    max_connections_per_host=get_env_int('UPSTREAM_MAX_CONNECTIONS_PER_HOST', 10),
+    idle_timeout=get_env_float('UPSTREAM_POOL_IDLE_TIMEOUT', 60.0),
+    pool_timeout=get_env_float('UPSTREAM_POOL_TIMEOUT', 3.0),
+)
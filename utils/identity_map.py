@@ -0,0 +1,73 @@
+from typing import Optional
+
+from flask import Flask, g, has_request_context
+
+'''
+Import example: from utils.identity_map import identity_map
+
+document = identity_map.get(Project, id)
+if document is None:
+    document = Project.objects.get(id=id)
+    identity_map.put(document)
+'''
+
+
+class _RequestDocuments:
+    def __init__(self) -> None:
+        # (document class name, id) -> document
+        self.documents = {}
+        # loads answered by the map instead of the database
+        self.hits = 0
+
+
+class IdentityMap:
+    """
+    Documents loaded by id during the current Flask request, so each one is read
+    from the database at most once per request. Outside of a request nothing is kept.
+
+    Writers must `evict` documents they change with `update()` or delete, as those
+    do not refresh the loaded instance.
+    """
+
+    def _get_documents(self) -> Optional[_RequestDocuments]:
+        if not has_request_context():
+            return None
+        if 'identity_map' not in g:
+            g.identity_map = _RequestDocuments()
+        return g.identity_map
+
+    def get(self, entity_type: type, id):
+        documents = self._get_documents()
+        if documents is None:
+            return None
+
+        document = documents.documents.get((entity_type.__name__, str(id)))
+        if document is not None:
+            documents.hits += 1
+        return document
+
+    def put(self, document) -> None:
+        documents = self._get_documents()
+        if documents is not None and document.pk is not None:
+            documents.documents[(type(document).__name__, str(document.pk))] = document
+
+    def evict(self, document) -> None:
+        documents = self._get_documents()
+        if documents is not None:
+            documents.documents.pop(
+                (type(document).__name__, str(document.pk)), None)
+
+    def get_hits(self) -> int:
+        documents = self._get_documents()
+        return documents.hits if documents is not None else 0
+
+
+identity_map = IdentityMap()
+
+
+def initialize_identity_map(app: Flask) -> None:
+    @app.after_request
+    def add_identity_map_hits(response):
+        # database reads saved by the identity map in this request
+        response.headers['X-Identity-Map-Hits'] = str(identity_map.get_hits())
+        return response
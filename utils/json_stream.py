@@ -0,0 +1,150 @@
+import json
+import time
+from typing import List, Optional
+
+try:
+    import ijson
+except ImportError:
+    # fall back to parsing the whole (size-capped) body at once
+    ijson = None
+
+'''
+Parse JSON straight from a stream, keeping only some sub-paths if required.
+
+Import example: from utils.json_stream import CappedReader, load_json
+'''
+
+
+class BodyTooLargeError(Exception):
+    def __init__(self, max_bytes: int) -> None:
+        super().__init__('Body is larger than {} bytes.'.format(max_bytes))
+        self.max_bytes = max_bytes
+
+
+class DeadlineExceededError(Exception):
+    def __init__(self) -> None:
+        super().__init__('Body is not read before the deadline.')
+
+
+class CappedReader:
+    """
+    A file-like wrapper which stops reading once more than `max_bytes` are read,
+    or once the monotonic `deadline` is passed if given.
+    """
+
+    def __init__(self, raw, max_bytes: int, deadline: Optional[float] = None) -> None:
+        self.raw = raw
+        self.max_bytes = max_bytes
+        self.deadline = deadline
+        self.bytes_read = 0
+
+    def _check_deadline(self) -> None:
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise DeadlineExceededError()
+
+    def read(self, size: int = -1) -> bytes:
+        self._check_deadline()
+        if size is None or size < 0:
+            # never read an unbounded amount at once
+            size = self.max_bytes + 1 - self.bytes_read
+
+        chunk = self.raw.read(size)
+        # a read cut off at the deadline returns a truncated body
+        self._check_deadline()
+        self.bytes_read += len(chunk)
+        if self.bytes_read > self.max_bytes:
+            raise BodyTooLargeError(self.max_bytes)
+        return chunk
+
+    def read_all(self) -> bytes:
+        chunks = []
+        while True:
+            chunk = self.read(64 * 1024)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return b''.join(chunks)
+
+
+def _set_path(document: dict, keys: List[str], value) -> None:
+    for key in keys[:-1]:
+        document = document.setdefault(key, {})
+    document[keys[-1]] = value
+
+
+def _select_paths(data, paths: List[str]) -> dict:
+    selected = {}
+    for path in paths:
+        keys = path.split('.')
+        value = data
+        for key in keys:
+            if not isinstance(value, dict) or key not in value:
+                break
+            value = value[key]
+        else:
+            _set_path(selected, keys, value)
+    return selected
+
+
+def _stream_paths(reader: CappedReader, paths: List[str]) -> dict:
+    # ijson names nested object keys with dots, same as the configured paths
+    wanted = set(paths)
+    selected = {}
+
+    builder = None
+    building = None
+    depth = 0
+
+    for prefix, event, value in ijson.parse(reader, use_float=True):
+        if builder is not None:
+            builder.event(event, value)
+            if event in ('start_map', 'start_array'):
+                depth += 1
+            elif event in ('end_map', 'end_array'):
+                depth -= 1
+
+            if depth == 0:
+                _set_path(selected, building.split('.'), builder.value)
+                builder = None
+            continue
+
+        if prefix not in wanted or event in ('map_key', 'end_map', 'end_array'):
+            continue
+
+        if event in ('start_map', 'start_array'):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            building = prefix
+            depth = 1
+        else:
+            _set_path(selected, prefix.split('.'), value)
+
+    return selected
+
+
+def load_json(reader: CappedReader, paths: List[str] = None):
+    """
+    Parse JSON from a reader.
+
+    Args:
+        reader (CappedReader): size-capped body stream
+        paths (List[str]): dotted paths to keep, or None to keep the whole document
+
+    Raises:
+        BodyTooLargeError: raises if body is larger than the cap of reader
+        ValueError: raises if body is not a valid JSON
+
+    Returns:
+        the parsed document, only containing `paths` if provided
+    """
+    if not paths:
+        # json.loads accepts bytes, no need to decode into a str first
+        return json.loads(reader.read_all())
+
+    if ijson is None:
+        return _select_paths(json.loads(reader.read_all()), paths)
+
+    try:
+        return _stream_paths(reader, paths)
+    except ijson.JSONError as e:
+        raise ValueError(str(e))
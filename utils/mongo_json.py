@@ -0,0 +1,103 @@
+import copy
+import datetime
+import json
+from typing import Optional
+
+from bson import DBRef, ObjectId, json_util
+from bson.json_util import LEGACY_JSON_OPTIONS
+
+from utils.time import get_millis
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+'''
+Import example: from utils.mongo_json import dumps_raw
+
+body = dumps_raw(Project.objects(id=id).as_pymongo().first())
+
+Raw documents, as loaded by `as_pymongo()` or pymongo, are serialized in the same
+legacy extended JSON as `Document.to_json()` (`{"$oid": ...}`, `{"$date": <millis>}`),
+without building documents. `orjson` is used if installed.
+
+Fields missing from documents stored before they were added are filled by
+`fill_defaults`, as `Document.to_json()` emits their defaults:
+
+body = dumps_raw(fill_defaults(Project, raw_project))
+'''
+
+# document type -> stored form of its field defaults, as `to_mongo()` of an empty document
+_stored_defaults = {}
+
+
+def fill_defaults(document_type: type, document: dict, projection: Optional[dict] = None) -> dict:
+    """
+    Fill the fields missing from a raw document with their defaults, in place.
+
+    Args:
+        document_type (type): model of the document
+        document (dict): raw document
+        projection (dict): projection of the query, such as `queryset._loaded_fields.as_dict()`,
+            only fields it loads are filled
+
+    Returns:
+        dict: the same document
+    """
+    defaults = _stored_defaults.get(document_type)
+    if defaults is None:
+        defaults = document_type().to_mongo().to_dict()
+        _stored_defaults[document_type] = defaults
+
+    projection = projection or {}
+    only = any(projection.values())
+    for key, value in defaults.items():
+        if key in document or projection.get(key, 0 if only else 1) == 0:
+            continue
+        # defaults such as [] must not be shared between documents
+        document[key] = copy.deepcopy(value)
+    return document
+
+
+def to_extended_json(value):
+    """
+    Convert a raw document to JSON compatible values, in one pass.
+
+    Args:
+        value: raw document, or any value in it
+
+    Returns:
+        object: value with BSON types replaced by legacy extended JSON
+    """
+    if isinstance(value, dict):
+        return {key: to_extended_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_extended_json(item) for item in value]
+    if isinstance(value, (str, int, float, bool)) or value is None:
+        return value
+    if isinstance(value, ObjectId):
+        return {'$oid': str(value)}
+    if isinstance(value, datetime.datetime):
+        return {'$date': get_millis(value)}
+    if isinstance(value, DBRef):
+        return {'$ref': value.collection, '$id': to_extended_json(value.id)}
+
+    # rare BSON types, such as Decimal128 and Binary
+    return to_extended_json(json_util.default(value, json_options=LEGACY_JSON_OPTIONS))
+
+
+def dumps_raw(value) -> str:
+    """
+    Serialize raw documents to legacy extended JSON.
+
+    Args:
+        value: raw document, or list of them
+
+    Returns:
+        str: JSON
+    """
+    value = to_extended_json(value)
+    if orjson is not None:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value)
@@ -0,0 +1,48 @@
+from typing import Union
+
+from bson import DBRef
+from mongoengine import Document
+
+'''
+Import example: from utils.ownership import is_created_by
+
+if not is_created_by(project, jwt_id):
+    raise ForbiddenError()
+'''
+
+
+def get_reference_id(document: Union[Document, dict], field: str):
+    """
+    Id stored in a reference field, without dereferencing it.
+
+    Args:
+        document (Document | dict): loaded document, or raw document from `as_pymongo`
+        field (str): name of a `ReferenceField`
+
+    Returns:
+        ObjectId: referenced id, or None if the field is not set
+    """
+    if isinstance(document, dict):
+        value = document.get(field)
+    else:
+        # `_data` keeps the raw DBRef until the field is accessed
+        value = document._data.get(field)
+    if isinstance(value, DBRef):
+        return value.id
+    if isinstance(value, Document):
+        return value.pk
+    return value
+
+
+def is_created_by(document: Union[Document, dict], user_id) -> bool:
+    """
+    Check if a document was created by a user, comparing the stored id
+    of `created_by` with the user id, so no user document is loaded.
+
+    Args:
+        document (Document | dict): loaded or raw document with a `created_by` field
+        user_id (str | ObjectId): id of user, such as jwt identity
+    """
+    created_by = get_reference_id(document, 'created_by')
+    return created_by is not None and user_id is not None \
+        and str(created_by) == str(user_id)
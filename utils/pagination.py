@@ -0,0 +1,112 @@
+import base64
+import binascii
+import datetime
+import json
+from collections import namedtuple
+from typing import Optional
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from errors import InvalidParamError
+from mongoengine.queryset.visitor import Q
+
+from utils.config import get_env_int
+from utils.mongo_json import fill_defaults
+from utils.time import get_millis
+
+'''
+Import example: from utils.pagination import paginate
+
+page = paginate(Project.objects(public=True), limit, cursor)
+page.items        # raw documents (dicts) of the page
+page.next_cursor  # pass as `next` to get the following page, None on the last page
+
+Pages are ordered by (`created`, `_id`), newest first. A cursor keeps the keys of
+the last document of its page, so each page is one range query on the compound
+index of the collection, however deep it is.
+'''
+
+DEFAULT_PAGE_LIMIT = get_env_int('DEFAULT_PAGE_LIMIT', 50)
+MAX_PAGE_LIMIT = get_env_int('MAX_PAGE_LIMIT', 200)
+
+Page = namedtuple('Page', ['items', 'next_cursor'])
+
+
+def encode_cursor(created: datetime.datetime, id: ObjectId) -> str:
+    raw = json.dumps([get_millis(created), str(id)], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor: str):
+    """
+    Returns:
+        Tuple[datetime, ObjectId]: `created` and `_id` of the last document of the previous page
+
+    Raises:
+        InvalidParamError: raises if the cursor was not issued by `encode_cursor`
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        millis, id = json.loads(raw.decode('utf-8'))
+        created = datetime.datetime(1970, 1, 1) + \
+            datetime.timedelta(milliseconds=int(millis))
+        return created, ObjectId(id)
+    except (binascii.Error, InvalidId, OverflowError, TypeError, ValueError):
+        raise InvalidParamError('"next" is not a valid cursor.')
+
+
+def get_page_limit(limit: Optional[str]) -> int:
+    if limit is None or limit == '':
+        return DEFAULT_PAGE_LIMIT
+
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise InvalidParamError('"limit" should be an integer.')
+
+    if not 1 <= limit <= MAX_PAGE_LIMIT:
+        raise InvalidParamError(
+            '"limit" should be between 1 and {}.'.format(MAX_PAGE_LIMIT))
+    return limit
+
+
+def paginate(queryset, limit: Optional[str] = None, cursor: Optional[str] = None) -> Page:
+    """
+    Get one page of a query with keyset pagination.
+
+    Args:
+        queryset (QuerySet): filtered (and projected) query of documents with `created`
+        limit (str): most documents of the page, `DEFAULT_PAGE_LIMIT` if None, capped by `MAX_PAGE_LIMIT`
+        cursor (str): `next_cursor` of the previous page, None for the first page
+
+    Raises:
+        InvalidParamError: raises if limit or cursor is invalid
+
+    Returns:
+        Page: raw documents of the page, as loaded by `as_pymongo` with defaults filled, and cursor of the next page
+    """
+    limit = get_page_limit(limit)
+
+    if cursor:
+        created, id = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(created__lt=created) | Q(created=created, id__lt=id))
+
+    # one more document than the page tells if there is a next page,
+    # raw documents keep the projection when serialized, as `QuerySet.to_json` does
+    items = list(queryset.order_by('-created', '-id').limit(limit + 1).as_pymongo())
+    # fields missing from older documents get their defaults, within the projection
+    projection = queryset._loaded_fields.as_dict()
+    for item in items:
+        fill_defaults(queryset._document, item, projection)
+    if len(items) <= limit:
+        return Page(items, None)
+
+    items = items[:limit]
+    last = items[-1]
+    created = last.get('created')
+    if created is None:
+        # `created` is not in the projection
+        created = queryset._document.objects(
+            id=last['_id']).scalar('created').first()
+    return Page(items, encode_cursor(created, last['_id']))
@@ -0,0 +1,155 @@
+import heapq
+import itertools
+import threading
+import time
+from typing import Callable, Hashable, Optional
+
+from utils.logger import get_the_logger
+
+logger = get_the_logger()
+
+
+class RefreshJob:
+    """
+    A repeating background refresh.
+
+    `refresh` returns the delay in seconds until the next run, or None to stop.
+    If it raises, the job runs again after `retry_delay` seconds. A job whose key
+    has not been touched since its last successful run, or for `idle_timeout`
+    seconds, is dropped instead of run.
+    """
+
+    def __init__(self,
+                 key: Hashable,
+                 refresh: Callable[[], Optional[float]],
+                 retry_delay: float,
+                 idle_timeout: float) -> None:
+        self.key = key
+        self.refresh = refresh
+        self.retry_delay = retry_delay
+        self.idle_timeout = idle_timeout
+
+
+class RefreshScheduler:
+    """
+    Run refresh jobs on one background worker thread, ordered by due time.
+
+    At most one run is pending per key. Scheduling a key which is already pending
+    replaces its job and keeps the earlier of the two due times.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+        # heap of (due, seq, key); stale heap items are skipped lazily
+        self._queue = []
+        self._seq = itertools.count()
+        # key -> (due, job) of the pending run
+        self._pending = {}
+        # key -> monotonic time of last access
+        self._last_touched = {}
+        # key -> monotonic time when the last successful run started
+        self._last_refreshed = {}
+
+        self._condition = threading.Condition()
+        self._worker = None
+
+        self.runs = 0
+        self.failures = 0
+        self.dropped = 0
+        self.last_lag = 0.0
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(
+                target=self._work, name=self.name, daemon=True)
+            self._worker.start()
+
+    def touch(self, key: Hashable) -> None:
+        with self._condition:
+            self._last_touched[key] = time.monotonic()
+
+    def schedule(self, job: RefreshJob, delay: float) -> None:
+        due = time.monotonic() + max(0.0, delay)
+
+        with self._condition:
+            pending = self._pending.get(job.key)
+            if pending is not None and pending[0] <= due:
+                self._pending[job.key] = (pending[0], job)
+                return
+
+            self._pending[job.key] = (due, job)
+            self._last_touched.setdefault(job.key, time.monotonic())
+            heapq.heappush(self._queue, (due, next(self._seq), job.key))
+
+            self._ensure_worker()
+            self._condition.notify()
+
+    def _next_job(self) -> RefreshJob:
+        with self._condition:
+            while True:
+                # skip heap items replaced by an earlier schedule
+                while self._queue:
+                    due, _, key = self._queue[0]
+                    pending = self._pending.get(key)
+                    if pending is not None and pending[0] == due:
+                        break
+                    heapq.heappop(self._queue)
+
+                if not self._queue:
+                    self._condition.wait()
+                    continue
+
+                due, _, key = self._queue[0]
+                now = time.monotonic()
+                if due > now:
+                    self._condition.wait(due - now)
+                    continue
+
+                heapq.heappop(self._queue)
+                _, job = self._pending.pop(key)
+                self.last_lag = now - due
+
+                # stop refreshing data nobody read since its last refresh
+                last_touched = self._last_touched.get(key, 0.0)
+                if now - last_touched > job.idle_timeout \
+                        or last_touched <= self._last_refreshed.get(key, float('-inf')):
+                    self._last_touched.pop(key, None)
+                    self._last_refreshed.pop(key, None)
+                    self.dropped += 1
+                    continue
+
+                return job
+
+    def _work(self) -> None:
+        while True:
+            job = self._next_job()
+            started = time.monotonic()
+
+            try:
+                delay = job.refresh()
+                with self._condition:
+                    # reads from now on ask for the next run
+                    self._last_refreshed[job.key] = started
+            except Exception as e:
+                self.failures += 1
+                logger.error('Refresh of {} failed. Type:{}, Detail:{}'.format(
+                    job.key, e.__class__.__name__, str(e)))
+                delay = job.retry_delay
+
+            self.runs += 1
+            if delay is not None:
+                self.schedule(job, delay)
+
+    def stats(self) -> dict:
+        with self._condition:
+            now = time.monotonic()
+            overdue = [now - due for due, _ in self._pending.values() if due <= now]
+            return {
+                'queue_depth': len(self._pending),
+                'lag': round(max(overdue), 3) if overdue else 0.0,
+                'last_lag': round(self.last_lag, 3),
+                'runs': self.runs,
+                'failures': self.failures,
+                'dropped': self.dropped,
+            }
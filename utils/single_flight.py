@@ -0,0 +1,60 @@
+import threading
+from typing import Callable, Hashable
+
+
+class _Call:
+    def __init__(self) -> None:
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent calls sharing the same key into one execution.
+
+    The first caller of a key runs the function. Callers arriving with the same key
+    while it is running wait for it and get the same result, or the same error.
+    """
+
+    def __init__(self) -> None:
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: Hashable, func: Callable, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not is_leader:
+            # wait for the leader and share its outcome
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args, **kwargs)
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result
+
+    def waiters(self) -> dict:
+        """
+        Returns:
+            dict: number of callers waiting on each in-flight key
+        """
+        with self._lock:
+            return {key: call.waiters for key, call in self._calls.items()}
@@ -1,5 +1,13 @@
+import calendar
 import datetime
 
 
 def get_utcnow():
     return datetime.datetime.utcnow
+
+
+def get_millis(value: datetime.datetime) -> int:
+    """
+    Milliseconds since epoch of a UTC datetime, the precision MongoDB keeps.
+    """
+    return calendar.timegm(value.utctimetuple()) * 1000 + value.microsecond // 1000